@@ -1,12 +1,17 @@
 import logging
+import re
 from appiumatic import actions
+from appiumatic import hashing
 from appiumatic.constants import *
+import instrumentation
 
 
 logger = logging.getLogger(__name__)
 
+_BOUNDS_PATTERN = re.compile(r"\[(-?\d+),(-?\d+)\]\[(-?\d+),(-?\d+)\]")
 
-def create_target(selector, selector_value, description, target_type, state):
+
+def create_target(selector, selector_value, description, target_type, state, bounds=None):
     target = {
         "selector": selector,
         "selectorValue": selector_value,
@@ -15,7 +20,7 @@ def create_target(selector, selector_value, description, target_type, state):
         "state": state
     }
 
-    return target
+    return actions.intern_target(target, bounds)
 
 
 def create_enter_target():
@@ -39,15 +44,97 @@ def create_launch_event():
     return partial_event
 
 
+class State(dict):
+    # A precondition or postcondition. States are shared by every event observed in them, so they are immutable.
+    __slots__ = ()
+
+    def __reduce__(self):
+        return State, (dict(self),)
+
+    def _raise_immutable(self, *args, **kwargs):
+        raise TypeError("States are immutable, create a new state instead.")
+
+    __setitem__ = _raise_immutable
+    __delitem__ = _raise_immutable
+    __ior__ = _raise_immutable
+    clear = _raise_immutable
+    pop = _raise_immutable
+    popitem = _raise_immutable
+    setdefault = _raise_immutable
+    update = _raise_immutable
+
+
+class Event(dict):
+    # An event is still a plain dictionary, but it can be used in sets and as a dict key. Its hash agrees with
+    # hashing.generate_event_hash, so it stays the same when the postcondition is attached or a text value changes,
+    # while equality still compares the whole dictionary; index by hashing.get_event_key for lookups that should
+    # ignore those differences as well.
+    # Events are immutable so that they can be cached and handed to several executors at once: the actions are kept
+    # as a tuple and the states as State mappings. with_postcondition and with_actions derive new events that share
+    # the unchanged precondition, actions and states. The hash is computed once, when it is first needed.
+    __slots__ = ("_hash",)
+
+    def __init__(self, event=()):
+        event = dict(event)
+        if isinstance(event.get("actions"), list):
+            event["actions"] = tuple(event["actions"])
+        for condition in ("precondition", "postcondition"):
+            if type(event.get(condition)) is dict:
+                event[condition] = State(event[condition])
+        super().__init__(event)
+
+    def __hash__(self):
+        try:
+            return self._hash
+        except AttributeError:
+            self._hash = hash(hashing.get_event_key(self))
+            return self._hash
+
+    __eq__ = dict.__eq__
+    __ne__ = dict.__ne__
+
+    def __reduce__(self):
+        return Event, (dict(self),)
+
+    def with_postcondition(self, postcondition):
+        # the postcondition is not part of the hash, so a computed hash is carried over
+        event = Event(dict(self, postcondition=postcondition))
+        try:
+            event._hash = self._hash
+        except AttributeError:
+            pass
+        return event
+
+    def with_actions(self, actions):
+        return Event(dict(self, actions=actions))
+
+    def _raise_immutable(self, *args, **kwargs):
+        raise TypeError("Events are immutable, derive a new event with with_postcondition or with_actions instead.")
+
+    __setitem__ = _raise_immutable
+    __delitem__ = _raise_immutable
+    __ior__ = _raise_immutable
+    clear = _raise_immutable
+    pop = _raise_immutable
+    popitem = _raise_immutable
+    setdefault = _raise_immutable
+    update = _raise_immutable
+
+
 def create_partial_event(precondition, actions):
-    partial_event = {
+    partial_event = Event({
         "precondition": precondition,
         "actions": actions
-    }
+    })
     return partial_event
 
 
 def create_partial_text_events(current_state, text_entry_actions, non_text_entry_actions):
+    with instrumentation.phase(Phase.EVENTS):
+        return _create_partial_text_events(current_state, text_entry_actions, non_text_entry_actions)
+
+
+def _create_partial_text_events(current_state, text_entry_actions, non_text_entry_actions):
     if len(text_entry_actions) == 1:
         logger.debug("Only one text field in the current state. We may need to use the ENTER key since it may be a search field.")
 
@@ -69,7 +156,7 @@ def create_partial_text_events(current_state, text_entry_actions, non_text_entry
 
 
 def create_events_for_single_text_field(current_state, text_entry_action, non_text_entry_actions):
-    text_entry_action.value = "[random string]"  # -- test this
+    text_entry_action = text_entry_action.with_value("[random string]")
 
     text_entry_enter_key_event = pair_text_entry_with_enter_key(current_state, text_entry_action)
     text_and_act_events = pair_text_entry_with_non_text_entry_actions(current_state, text_entry_action,
@@ -103,13 +190,12 @@ def create_events_for_multiple_text_fields(current_state, text_entry_actions, no
     text_based_events = []
     text_based_actions = []
     for text_entry_action in text_entry_actions:
-        text_entry_action.value = "[random string]"
-        text_based_actions.append(text_entry_action)
+        text_based_actions.append(text_entry_action.with_value("[random string]"))
 
     for non_text_entry_action in non_text_entry_actions:
         action_pairs_with_text_entry = does_action_pair_with_text_entry(non_text_entry_action)
         if action_pairs_with_text_entry:
-            multiple_text_entry_event = create_partial_event(current_state, text_entry_actions + [non_text_entry_action])
+            multiple_text_entry_event = create_partial_event(current_state, text_based_actions + [non_text_entry_action])
             text_based_events.append(multiple_text_entry_event)
 
     return text_based_events
@@ -132,9 +218,10 @@ def does_action_pair_with_text_entry(non_text_entry_action):
 
 def create_partial_events(current_state, possible_actions):
     events = []
-    for action in possible_actions:
-        event = create_partial_event(current_state, [action])
-        events.append(event)
+    with instrumentation.phase(Phase.EVENTS):
+        for action in possible_actions:
+            event = create_partial_event(current_state, [action])
+            events.append(event)
 
     return events
 
@@ -160,7 +247,7 @@ def create_background_event(precondition):
     return background_event
 
 
-def create_action(action_type, widget):
+def create_action(action_type, widget, value=None):
     action_types = {
         GUIActionType.CLICK: actions.Click,
         GUIActionType.LONG_CLICK: actions.LongClick,
@@ -179,26 +266,31 @@ def create_action(action_type, widget):
         SystemActionType.LAUNCH: actions.LaunchApp
     }
     action_class = action_types[action_type]
-    action = action_class(widget, action_type, None)
+    action = action_class(widget, action_type, value)
     return action
 
 
-def create_ui_widget(xml_tree, element):
-    selection_mechanism = _get_widget_selector(xml_tree, element)
-    widget_description = _get_widget_description(element)
-    widget_type = _get_widget_type(element)
-    widget_state = _get_widget_state(element)
-    target = {
-        "selector": selection_mechanism[0],
-        "selectorValue": selection_mechanism[1],
-        "description": widget_description,
-        "type": widget_type,
-        "state": widget_state
-    }
+def create_ui_widget(xml_tree, element, resource_id_index=None):
+    selection_mechanism = _get_widget_selector(xml_tree, element, resource_id_index)
+    widget_description, widget_type, widget_state = get_widget_properties(element)
+    target = create_target(selection_mechanism[0], selection_mechanism[1], widget_description, widget_type,
+                           widget_state, get_widget_bounds(element))
 
     return target
 
 
+def get_widget_properties(element):
+    return _get_widget_description(element), _get_widget_type(element), _get_widget_state(element)
+
+
+def get_widget_bounds(element):
+    bounds_match = _BOUNDS_PATTERN.match(element.attrib.get("bounds", ""))
+    if bounds_match is None:
+        return None
+
+    return tuple(int(coordinate) for coordinate in bounds_match.groups())
+
+
 def _get_widget_state(element):
     element_attributes = element.attrib
     if element_attributes.get(TargetState.ENABLED, "") == "true":
@@ -213,16 +305,34 @@ def _get_widget_type(element):
     return class_value.split(".")[-1]
 
 
-def _get_widget_selector(xml_tree, element):
+def create_resource_id_index(xml_tree):
+    # counts how often each resource-id occurs so selector resolution does not have to search the tree
+    resource_id_index = {}
+    for element in xml_tree.getroot().iterdescendants("*"):
+        resource_id = element.attrib.get("resource-id")
+        if resource_id is not None:
+            resource_id_index[resource_id] = resource_id_index.get(resource_id, 0) + 1
+
+    return resource_id_index
+
+
+def _get_widget_selector(xml_tree, element, resource_id_index=None):
     element_attributes = element.attrib
     resource_id = element_attributes.get("resource-id", "")
-    id_not_unique = len(_get_elements_with_id(resource_id, xml_tree)) > 1
-    if resource_id.strip() == "" or id_not_unique:
+    if resource_id_index is None:
+        id_count = len(_get_elements_with_id(resource_id, xml_tree))
+    else:
+        id_count = resource_id_index.get(resource_id, 0)
+    if not is_unique_resource_id(resource_id, id_count):
         return "xpath", xml_tree.getpath(element)
 
     return "id", resource_id
 
 
+def is_unique_resource_id(resource_id, id_count):
+    return resource_id.strip() != "" and id_count <= 1
+
+
 def _get_elements_with_id(resource_id, xml_tree):
     return xml_tree.getroot().findall(".//*[@resource-id='" + resource_id + "']".format(resource_id))
 
@@ -247,35 +357,70 @@ def synthesize(partial_event, current_state):
         "activityName": current_state["activityName"],
         "stateId": current_state["stateId"]
     }
-    partial_event["postcondition"] = postcondition
-    return partial_event
+    # the partial event is left as it is, so it can still be executed again or shared with other executors
+    if not isinstance(partial_event, Event):
+        partial_event = Event(partial_event)
+    return partial_event.with_postcondition(postcondition)
 
 
 def create_state(current_activity, state_id):
-    state = {
+    state = State({
         "activityName": current_activity,
         "stateId": state_id
-    }
+    })
 
     return state
 
 
+def create_snapshot(page_source, possible_actions, state, rotation=None):
+    snapshot = {
+        "pageSource": page_source,
+        "possibleActions": possible_actions,
+        "state": state,
+        "rotation": rotation
+    }
+
+    return snapshot
+
+
 def create_crash_state():
-    state= {
+    state = State({
         "activityName": "crash",
         "stateId": "crash"
-    }
+    })
 
     return state
 
 
 def make_event_serializable(event):
-    non_serializable_actions = event["actions"]
-    actions_as_dicts = []
-    for action in non_serializable_actions:
-        actions_as_dicts.append(action.to_dict())
+    return create_serializable_event(event)
 
-    event["actions"] = actions_as_dicts
+
+def create_serializable_event(event):
+    # a new dictionary with the actions as dicts; the event itself keeps its actions
+    serializable_event = dict(event)
+    serializable_event["actions"] = [action.to_dict() for action in event["actions"]]
+
+    return serializable_event
+
+
+def make_event_executable(serializable_event):
+    executable_actions = []
+    for action_as_dict in serializable_event["actions"]:
+        executable_actions.append(make_action_executable(action_as_dict))
+
+    event = create_partial_event(serializable_event["precondition"], executable_actions)
+    if "postcondition" in serializable_event:
+        event = event.with_postcondition(serializable_event["postcondition"])
 
     return event
 
+
+def make_action_executable(action_as_dict):
+    target_as_dict = action_as_dict["target"]
+    bounds = target_as_dict.get("bounds")
+    target = create_target(target_as_dict["selector"], target_as_dict["selectorValue"], target_as_dict["description"],
+                           target_as_dict["type"], target_as_dict["state"], None if bounds is None else tuple(bounds))
+    action = create_action(action_as_dict["type"], target, action_as_dict["value"])
+
+    return action
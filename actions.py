@@ -1,35 +1,253 @@
 import logging
-from appiumatic.constants import SelectorType, KeyCode
+import weakref
+from collections import OrderedDict
+from appiumatic.constants import SelectorType, KeyCode, InputSource, Phase
 from appium.webdriver.common.touch_action import TouchAction
+from selenium.common.exceptions import StaleElementReferenceException
 from exceptions import UnknownAction
+import instrumentation
 
 logger = logging.getLogger(__name__)
 
+_W3C_RETURN_KEY = "\ue007"
+_W3C_CONTROL_KEY = "\ue009"
+_W3C_BACKSPACE_KEY = "\ue003"
+# milliseconds between focusing a text field and typing into it, so that the keyboard is ready for the first key
+_FOCUS_PAUSE_DURATION = 300
+
+
+_interned_targets = weakref.WeakValueDictionary()
+
+
+def intern_target(target, bounds=None):
+    # identical targets share one immutable Target, so long event histories do not keep a copy per action
+    if type(target) is Target and (bounds is None or bounds == target.bounds):
+        return target
+    if bounds is None:
+        bounds = getattr(target, "bounds", None)
+
+    target_key = (tuple(sorted(target.items())), bounds)
+    interned_target = _interned_targets.get(target_key)
+    if interned_target is None:
+        interned_target = Target(target, bounds)
+        _interned_targets[target_key] = interned_target
+
+    return interned_target
+
+
+class Target(dict):
+    # The bounds are the (left, top, right, bottom) screen rectangle the widget had in the snapshot it was found in.
+    # They are only used to act on the widget by coordinates and take no part in equality or hashing; Action.to_dict
+    # writes them as a "bounds" list next to the target fields.
+    __slots__ = ("_bounds", "_hash", "__weakref__")
+
+    def __init__(self, target=(), bounds=None):
+        super().__init__(target)
+        self._bounds = bounds
+        self._hash = hash(frozenset(self.items()))
+
+    @property
+    def bounds(self):
+        return self._bounds
+
+    def __hash__(self):
+        return self._hash
+
+    def __reduce__(self):
+        return intern_target, (dict(self), self._bounds)
+
+    def _raise_immutable(self, *args, **kwargs):
+        raise TypeError("Targets are immutable, create a new target instead.")
+
+    __setitem__ = _raise_immutable
+    __delitem__ = _raise_immutable
+    __ior__ = _raise_immutable
+    clear = _raise_immutable
+    pop = _raise_immutable
+    popitem = _raise_immutable
+    setdefault = _raise_immutable
+    update = _raise_immutable
+
+
+class SessionCache(object):
+    # Keeps what a driver session would otherwise fetch again and again. Element handles are keyed by the state id of
+    # the latest observed snapshot, so that acting on widgets of a screen that stays the same skips the locator round
+    # trip. A handle is only valid while that state is the one observed: the handles of a state are evicted as soon as
+    # another state is observed, and a handle that turns out to be stale is evicted and looked up again. The window
+    # size is kept until the rotation reported by a snapshot changes or the geometry is invalidated.
+    def __init__(self, max_elements=256):
+        self.state_id = None
+        self.max_elements = max_elements
+        self._elements = OrderedDict()
+        self.rotation = None
+        self._window_size = None
+
+    def set_state(self, state_id):
+        if state_id != self.state_id:
+            self.evict_state(self.state_id)
+            self.state_id = state_id
+
+    def get_element(self, target):
+        if self.state_id is None:
+            return None
+
+        element_key = (self.state_id, target["selector"], target["selectorValue"])
+        element = self._elements.get(element_key)
+        if element is not None:
+            self._elements.move_to_end(element_key)
+        return element
+
+    def put_element(self, target, element):
+        if self.state_id is None:
+            return
+
+        self._elements[(self.state_id, target["selector"], target["selectorValue"])] = element
+        if len(self._elements) > self.max_elements:
+            self._elements.popitem(last=False)
+
+    def evict_state(self, state_id):
+        for element_key in [element_key for element_key in self._elements if element_key[0] == state_id]:
+            del self._elements[element_key]
+
+    def get_window_size(self, driver):
+        # the screen size only changes with the orientation, so it is fetched once per rotation
+        if self._window_size is None:
+            self._window_size = driver.get_window_size()
+        return self._window_size
+
+    def set_rotation(self, rotation):
+        if rotation != self.rotation:
+            self.invalidate_geometry()
+            self.rotation = rotation
+
+    def invalidate_geometry(self):
+        self._window_size = None
+
+    def clear(self):
+        self._elements.clear()
+        self.invalidate_geometry()
+
 
 class Action:
+    # Actions are immutable so that events can be cached and shared between executors. Derive a variant with another
+    # text value through with_value, which shares the interned target and the hash key with the original.
+    __slots__ = ("_target", "_action_type", "_value", "_hash_key")
+
     def __init__(self, target, action_type, value=None):
-        self.target = target
-        self.action_type = action_type
-        self.value = value
+        self._target = intern_target(target)
+        self._action_type = action_type
+        self._value = value
+        self._hash_key = None
+
+    @property
+    def target(self):
+        return self._target
+
+    @property
+    def action_type(self):
+        return self._action_type
+
+    @property
+    def value(self):
+        return self._value
+
+    def with_value(self, value):
+        if value == self._value:
+            return self
+
+        action = object.__new__(type(self))
+        action._target = self._target
+        action._action_type = self._action_type
+        action._value = value
+        action._hash_key = self._hash_key
+        return action
+
+    @property
+    def hash_key(self):
+        # the parts of an action that identify it for hashing; the value and description are deliberately left out
+        if self._hash_key is None:
+            self._hash_key = (self._action_type, self._target["selector"], self._target["selectorValue"],
+                              self._target["state"], self._target["type"])
+        return self._hash_key
+
+    def find_element(self, driver, session_cache=None):
+        if session_cache is not None:
+            element = session_cache.get_element(self.target)
+            if element is not None:
+                return element
 
-    def find_element(self, driver):
         selector = self.target["selector"]
         selector_value = self.target["selectorValue"]
-        if selector == SelectorType.ID:
-            element = driver.find_element_by_id(selector_value)
-        elif selector == SelectorType.XPATH:
-            element = driver.find_element_by_xpath(selector_value)
-        else:
-            element = None
-
+        with instrumentation.phase(Phase.ELEMENT_LOOKUP):
+            if selector == SelectorType.ID:
+                element = driver.find_element_by_id(selector_value)
+            elif selector == SelectorType.XPATH:
+                element = driver.find_element_by_xpath(selector_value)
+            else:
+                element = None
+
+        if session_cache is not None and element is not None:
+            session_cache.put_element(self.target, element)
         return element
 
-    def execute(self, driver):
+    def act_on_element(self, driver, session_cache, operation):
+        # calls operation with the target's element; when a handle has gone stale, the handles of the state are
+        # evicted and only the operation is repeated on an element looked up again
+        element = self.find_element(driver, session_cache)
+        try:
+            return operation(element)
+        except StaleElementReferenceException:
+            if session_cache is None:
+                raise
+
+            logger.debug("Element for {} is stale, looking it up again.".format(self.target["description"]))
+            session_cache.evict_state(session_cache.state_id)
+            return operation(self.find_element(driver, session_cache))
+
+    def execute(self, driver, session_cache=None):
         raise UnknownAction("Unknown action.")
 
+    def execute_at_bounds(self, driver):
+        # acts on the centre of the target's bounds without looking the element up; returns False when the action
+        # cannot be performed that way
+        return False
+
+    def get_input_steps(self):
+        # the W3C input steps that perform this action, as (input source, step) pairs, or None when the action cannot
+        # be expressed as an input sequence
+        return None
+
+    def get_tap_steps(self, hold_duration=0):
+        bounds_center = self.get_bounds_center()
+        if bounds_center is None:
+            return None
+
+        tap_steps = [
+            (InputSource.POINTER, {"type": "pointerMove", "duration": 0, "x": bounds_center[0], "y": bounds_center[1]}),
+            (InputSource.POINTER, {"type": "pointerDown", "button": 0})
+        ]
+        if hold_duration > 0:
+            tap_steps.append((InputSource.POINTER, {"type": "pause", "duration": hold_duration}))
+        tap_steps.append((InputSource.POINTER, {"type": "pointerUp", "button": 0}))
+        return tap_steps
+
+    def get_bounds_center(self):
+        bounds = self.target.bounds
+        if bounds is None:
+            return None
+
+        left, top, right, bottom = bounds
+        if right <= left or bottom <= top:
+            return None
+
+        return (left + right) // 2, (top + bottom) // 2
+
     def to_dict(self):
+        target = self.target
+        if getattr(target, "bounds", None) is not None:
+            target = dict(target, bounds=list(target.bounds))
         action_as_dict = {
-            "target": self.target,
+            "target": target,
             "type": self.action_type,
             "value": self.value
         }
@@ -42,130 +260,220 @@ class Action:
 
         return False
 
+    def __hash__(self):
+        # equal actions have equal hash keys; the value is left out so that variants from with_value hash alike
+        return hash(self.hash_key)
+
 
 class Click(Action):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
-        element = self.find_element(driver)
-        element.click()
+    def execute(self, driver, session_cache=None):
+        self.act_on_element(driver, session_cache, lambda element: element.click())
+
+    def execute_at_bounds(self, driver):
+        bounds_center = self.get_bounds_center()
+        if bounds_center is None:
+            return False
+
+        driver.tap([bounds_center])
+        return True
+
+    def get_input_steps(self):
+        return self.get_tap_steps()
 
 
 class TextEntry(Action):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Filling in text field: {}".format(self.target["description"]))
         logger.info("Typing text: {}".format(self.value))
-        text_field_element = self.find_element(driver)
-        text_field_element.send_keys(self.value)
+        self.act_on_element(driver, session_cache, lambda text_field_element: text_field_element.send_keys(self.value))
+
+    def get_input_steps(self):
+        # focuses the field by tapping it, waits for the keyboard, then replaces the text like send_keys does: select
+        # all and delete, and type the value
+        tap_steps = self.get_tap_steps()
+        if tap_steps is None or self.value is None:
+            return None
+
+        key_steps = [
+            (InputSource.KEY, {"type": "pause", "duration": _FOCUS_PAUSE_DURATION}),
+            (InputSource.KEY, {"type": "keyDown", "value": _W3C_CONTROL_KEY}),
+            (InputSource.KEY, {"type": "keyDown", "value": "a"}),
+            (InputSource.KEY, {"type": "keyUp", "value": "a"}),
+            (InputSource.KEY, {"type": "keyUp", "value": _W3C_CONTROL_KEY}),
+            (InputSource.KEY, {"type": "keyDown", "value": _W3C_BACKSPACE_KEY}),
+            (InputSource.KEY, {"type": "keyUp", "value": _W3C_BACKSPACE_KEY})
+        ]
+        for character in self.value:
+            key_steps.append((InputSource.KEY, {"type": "keyDown", "value": character}))
+            key_steps.append((InputSource.KEY, {"type": "keyUp", "value": character}))
+        return tap_steps + key_steps
 
 
 class Home(Action):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Pressing HOME navigation button.")
         driver.press_keycode(KeyCode.HOME)
 
 
 class Back(Action):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Pressing BACK navigation button.")
         driver.press_keycode(KeyCode.BACK)
 
 
 class ReturnKey(Action):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Pressing RETURN key.")
         driver.press_keycode(KeyCode.RETURN)
 
+    def get_input_steps(self):
+        return [(InputSource.KEY, {"type": "keyDown", "value": _W3C_RETURN_KEY}),
+                (InputSource.KEY, {"type": "keyUp", "value": _W3C_RETURN_KEY})]
+
 
 class RunInBackground(Action):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Running app in background for 1 second.")
         driver.background_app(1)
 
 
 class LongClick(Action):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Executing long-click event.")
-        element = self.find_element(driver)
+        self.act_on_element(driver, session_cache, lambda element: TouchAction(driver).long_press(element).perform())
+
+    def execute_at_bounds(self, driver):
+        bounds_center = self.get_bounds_center()
+        if bounds_center is None:
+            return False
+
+        logger.info("Executing long-click event at {}.".format(bounds_center))
         action = TouchAction(driver)
-        action.long_press(element).perform()
+        action.long_press(x=bounds_center[0], y=bounds_center[1]).perform()
+        return True
+
+    def get_input_steps(self):
+        return self.get_tap_steps(hold_duration=1000)
+
 
+class Swipe(Action):
+    __slots__ = ()
+
+    def get_swipe_area(self, driver, session_cache=None):
+        # swipes stay inside the scrollable widget when its bounds are known, otherwise they span the screen
+        bounds = self.target.bounds
+        if bounds is not None and bounds[2] > bounds[0] and bounds[3] > bounds[1]:
+            return bounds[0], bounds[1], bounds[2] - bounds[0], bounds[3] - bounds[1]
+
+        if session_cache is None:
+            screen_size = driver.get_window_size()
+        else:
+            screen_size = session_cache.get_window_size(driver)
+        return 0, 0, screen_size["width"], screen_size["height"]
+
+
+class SwipeUp(Swipe):
+    __slots__ = ()
 
-class SwipeUp(Action):
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
-        logger.info("Executing long-click event.")
-        screen_size = driver.get_window_size()
-        start_y = int(screen_size["height"] * 0.80)
-        end_y = int(screen_size["width"] * 0.20)
-        start_x = int(screen_size["width"] / 2)
+    def execute(self, driver, session_cache=None):
+        logger.info("Executing swipe up event.")
+        left, top, width, height = self.get_swipe_area(driver, session_cache)
+        start_y = int(top + height * 0.80)
+        end_y = int(top + height * 0.20)
+        start_x = int(left + width / 2)
         driver.swipe(start_x, start_y, start_x, end_y, 200)
 
 
-class SwipeDown(Action):
+class SwipeDown(Swipe):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Executing swipe down event.")
-        screen_size = driver.get_window_size()
-        start_y = int(screen_size["height"] * 0.20)
-        end_y = int(screen_size["height"] * 0.80)
-        start_x = int(screen_size["width"] / 2)
+        left, top, width, height = self.get_swipe_area(driver, session_cache)
+        start_y = int(top + height * 0.20)
+        end_y = int(top + height * 0.80)
+        start_x = int(left + width / 2)
         driver.swipe(start_x, start_y, start_x, end_y, 200)
 
 
-class SwipeRight(Action):
+class SwipeRight(Swipe):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Executing swipe right event.")
-        screen_size = driver.get_window_size()
-        start_x = int(screen_size["width"] * 0.20)
-        end_x = int(screen_size["width"] * 0.80)
-        start_y = int(screen_size["height"] / 2)
+        left, top, width, height = self.get_swipe_area(driver, session_cache)
+        start_x = int(left + width * 0.20)
+        end_x = int(left + width * 0.80)
+        start_y = int(top + height / 2)
         driver.swipe(start_x, start_y, end_x, start_y, 200)
 
 
-class SwipeLeft(Action):
+class SwipeLeft(Swipe):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         logger.info("Executing swipe left event.")
-        screen_size = driver.get_window_size()
-        start_x = int(screen_size["width"] * 0.80)
-        end_x = int(screen_size["width"] * 0.20)
-        start_y = int(screen_size["height"] / 2.0)
+        left, top, width, height = self.get_swipe_area(driver, session_cache)
+        start_x = int(left + width * 0.80)
+        end_x = int(left + width * 0.20)
+        start_y = int(top + height / 2)
         driver.swipe(start_x, start_y, end_x, start_y, 200)
 
+
 class LaunchApp(Action):
+    __slots__ = ()
+
     def __init__(self, target, action_type, value=None):
         super().__init__(target, action_type, value)
 
-    def execute(self, driver):
+    def execute(self, driver, session_cache=None):
         pass
 
 
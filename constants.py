@@ -49,3 +49,25 @@ class KeyCode:
 class TargetState:
     ENABLED = "enabled"
     DISABLED = "disabled"
+
+
+class HashAlgorithm:
+    SHA1 = "sha1"
+    BLAKE2B = "blake2b"
+
+
+class InputSource:
+    POINTER = "pointer"
+    KEY = "key"
+
+
+class Phase:
+    PAGE_SOURCE = "pageSource"
+    ACTIVITY = "activity"
+    PARSE = "parse"
+    SELECTORS = "selectors"
+    HASHING = "hashing"
+    EVENTS = "events"
+    ACTIONS = "actions"
+    ELEMENT_LOOKUP = "elementLookup"
+    SETTLE = "settle"
@@ -0,0 +1,100 @@
+import json
+import logging
+import os
+
+import abstraction
+
+logger = logging.getLogger(__name__)
+
+EVENT_RECORD = "event"
+TEST_CASE_RECORD = "testCase"
+
+
+def open_event_writer(stream_path, append=True, sync=False):
+    return EventStreamWriter(stream_path, append, sync)
+
+
+def read_events(stream_path, executable=True):
+    for record_type, record in read_records(stream_path, executable):
+        if record_type == EVENT_RECORD:
+            yield record
+
+
+def read_test_cases(stream_path, executable=True):
+    for record_type, record in read_records(stream_path, executable):
+        if record_type == TEST_CASE_RECORD:
+            yield record
+
+
+def read_records(stream_path, executable=True):
+    # Yields (record type, record) pairs one line at a time, so memory does not grow with the size of the stream.
+    # Lines that cannot be parsed, such as a record cut short by a crash mid-write, are logged and skipped.
+    with open(stream_path, encoding="utf-8") as stream_file:
+        for line_number, line in enumerate(stream_file, 1):
+            if not line.strip():
+                continue
+
+            try:
+                record = json.loads(line)
+            except ValueError:
+                logger.warning("Skipping incomplete record at line {} of {}.".format(line_number, stream_path))
+                continue
+
+            if EVENT_RECORD in record:
+                event = record[EVENT_RECORD]
+                yield EVENT_RECORD, abstraction.make_event_executable(event) if executable else event
+            else:
+                test_case = record[TEST_CASE_RECORD]
+                if executable:
+                    test_case = [abstraction.make_event_executable(event) for event in test_case]
+                yield TEST_CASE_RECORD, test_case
+
+
+class EventStreamWriter(object):
+    # Appends events and test cases to a JSON Lines file as they are produced. Every record is flushed as soon as it
+    # is written (and fsynced with sync=True), so a crash loses at most the record being written. Events are
+    # serialized with abstraction.create_serializable_event and are left untouched.
+    def __init__(self, stream_path, append=True, sync=False):
+        self.stream_path = stream_path
+        self.sync = sync
+        self.record_count = 0
+        if append:
+            self._terminate_incomplete_record(stream_path)
+        self._stream_file = open(stream_path, "a" if append else "w", encoding="utf-8")
+
+    @staticmethod
+    def _terminate_incomplete_record(stream_path):
+        # a record cut short by a crash must not swallow the first record written after resuming
+        try:
+            with open(stream_path, "rb+") as stream_file:
+                stream_file.seek(0, os.SEEK_END)
+                if stream_file.tell() == 0:
+                    return
+                stream_file.seek(-1, os.SEEK_END)
+                if stream_file.read(1) != b"\n":
+                    stream_file.write(b"\n")
+        except FileNotFoundError:
+            pass
+
+    def write_event(self, event):
+        self._write_record({EVENT_RECORD: abstraction.create_serializable_event(event)})
+
+    def write_test_case(self, test_case):
+        self._write_record({TEST_CASE_RECORD: [abstraction.create_serializable_event(event) for event in test_case]})
+
+    def _write_record(self, record):
+        self._stream_file.write(json.dumps(record) + "\n")
+        self._stream_file.flush()
+        if self.sync:
+            os.fsync(self._stream_file.fileno())
+        self.record_count += 1
+
+    def close(self):
+        self._stream_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
@@ -16,3 +16,15 @@ class UnknownAction(Exception):
     def __init__(self, message):
         super().__init__()
         self.message = message
+
+
+class InvalidSuiteFormat(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
+
+
+class SessionPoolClosed(Exception):
+    def __init__(self, message):
+        super().__init__(message)
+        self.message = message
@@ -1,33 +1,272 @@
+import asyncio
+import hashlib
 import logging
 import random
 import time
+from collections import deque
 
+from selenium.common.exceptions import InvalidArgumentException, UnknownMethodException, WebDriverException
+from selenium.webdriver.remote.command import Command
 from appiumatic.constants import *
+import abstraction
+import instrumentation
 
 logger = logging.getLogger(__name__)
 
+SETTLE_TIME_HISTORY = 1000
 
-def create_executor(driver, event_interval, text_values):
-    return Executor(driver, event_interval, text_values)
+
+def create_executor(driver, event_interval, text_values, session_cache=None, tap_by_coordinates=False,
+                    settle_wait=None, batch_actions=False):
+    return Executor(driver, event_interval, text_values, session_cache, tap_by_coordinates, settle_wait,
+                    batch_actions)
+
+
+def compile_input_actions(actions):
+    # Turns the actions of an event into one W3C actions request, or None if any of them cannot be expressed as
+    # input steps. Every tick advances both input sources, so the idle one pauses.
+    pointer_steps = []
+    key_steps = []
+    for action in actions:
+        input_steps = action.get_input_steps()
+        if input_steps is None:
+            return None
+
+        for input_source, input_step in input_steps:
+            if input_source == InputSource.POINTER:
+                pointer_steps.append(input_step)
+                key_steps.append({"type": "pause", "duration": 0})
+            else:
+                key_steps.append(input_step)
+                pointer_steps.append({"type": "pause", "duration": 0})
+
+    input_actions = {
+        "actions": [
+            {"type": "pointer", "id": "finger1", "parameters": {"pointerType": "touch"}, "actions": pointer_steps},
+            {"type": "key", "id": "keyboard", "actions": key_steps}
+        ]
+    }
+    return input_actions
+
+
+def create_async_executor(driver, event_interval, text_values, session_cache=None, tap_by_coordinates=False,
+                          settle_wait=None, batch_actions=False, thread_pool=None):
+    executor = Executor(driver, event_interval, text_values, session_cache, tap_by_coordinates, settle_wait,
+                        batch_actions)
+    return AsyncExecutor(executor, thread_pool)
+
+
+def get_activity_signal(driver):
+    return driver.current_activity
+
+
+def get_page_source_signal(driver):
+    return hashlib.sha1(driver.page_source.encode("utf-8")).hexdigest()
+
+
+class AdaptiveWait(object):
+    # Polls a cheap idle signal after an event and returns once it has stopped changing, instead of always waiting
+    # for the whole event interval. The event interval remains the upper bound.
+    def __init__(self, idle_signal=get_activity_signal, poll_interval=0.25, stable_polls=2):
+        self.idle_signal = idle_signal
+        self.poll_interval = poll_interval
+        self.stable_polls = stable_polls
+
+    def wait(self, driver, max_wait):
+        start_time = time.monotonic()
+        deadline = start_time + max_wait
+        try:
+            previous_signal = self.idle_signal(driver)
+            stable_polls = 0
+            while stable_polls < self.stable_polls:
+                remaining_time = deadline - time.monotonic()
+                if remaining_time <= 0:
+                    break
+
+                time.sleep(min(self.poll_interval, remaining_time))
+                current_signal = self.idle_signal(driver)
+                if current_signal == previous_signal:
+                    stable_polls += 1
+                else:
+                    stable_polls = 0
+                    previous_signal = current_signal
+        except WebDriverException as e:
+            logger.debug("Idle signal unavailable, waiting for the full event interval: {}".format(e))
+            time.sleep(max(0, deadline - time.monotonic()))
+
+        return time.monotonic() - start_time
+
+    async def wait_async(self, driver, max_wait, thread_pool=None):
+        loop = asyncio.get_running_loop()
+        start_time = time.monotonic()
+        deadline = start_time + max_wait
+        try:
+            previous_signal = await loop.run_in_executor(thread_pool, self.idle_signal, driver)
+            stable_polls = 0
+            while stable_polls < self.stable_polls:
+                remaining_time = deadline - time.monotonic()
+                if remaining_time <= 0:
+                    break
+
+                await asyncio.sleep(min(self.poll_interval, remaining_time))
+                current_signal = await loop.run_in_executor(thread_pool, self.idle_signal, driver)
+                if current_signal == previous_signal:
+                    stable_polls += 1
+                else:
+                    stable_polls = 0
+                    previous_signal = current_signal
+        except WebDriverException as e:
+            logger.debug("Idle signal unavailable, waiting for the full event interval: {}".format(e))
+            await asyncio.sleep(max(0, deadline - time.monotonic()))
+
+        return time.monotonic() - start_time
 
 
 class Executor(object):
-    def __init__(self, driver, event_interval, text_values):
+    def __init__(self, driver, event_interval, text_values, session_cache=None, tap_by_coordinates=False,
+                 settle_wait=None, batch_actions=False):
         self.driver = driver
         self.event_interval = event_interval
         self.text_values = text_values
+        self.session_cache = session_cache
+        self.tap_by_coordinates = tap_by_coordinates
+        self.settle_wait = settle_wait
+        self.batch_actions = batch_actions
+        # only the most recent settle times are kept, so long explorations do not grow without bound
+        self.settle_times = deque(maxlen=SETTLE_TIME_HISTORY)
+        self.observed_state_id = None
 
     def execute(self, event):
-        actions = event["actions"]
-        for action in actions:
+        # Returns the event as executed, i.e. with the text values that were typed; the given event is not changed.
+        # An executed event closes the instrumentation step that began with the snapshot it was chosen from.
+        with instrumentation.phase(Phase.ACTIONS):
+            executed_event = self._execute_event_actions(event)
+        with instrumentation.phase(Phase.SETTLE):
+            self._wait_for_ui_to_settle()
+        instrumentation.end_step()
+        return executed_event
+
+    def observe_snapshot(self, snapshot):
+        # The state of the latest snapshot tells which events still have current bounds, and snapshots report the
+        # screen rotation; cached geometry is dropped when it changes.
+        self.observed_state_id = snapshot["state"]["stateId"]
+        if self.session_cache is not None and snapshot.get("rotation") is not None:
+            self.session_cache.set_rotation(snapshot["rotation"])
+
+    def _execute_event_actions(self, event):
+        # handles are only cached for the state the latest snapshot observed, never for the state an event expects
+        if self.session_cache is not None:
+            self.session_cache.set_state(self.observed_state_id)
+
+        actions = []
+        for action in event["actions"]:
             if action.action_type == GUIActionType.TEXT_ENTRY:
-                selected_text_value = random.choice(self.text_values)
-                action.value = selected_text_value
+                action = action.with_value(random.choice(self.text_values))
+            actions.append(action)
+
+        # bounds are only current for events chosen from the latest observed snapshot; events replayed from a stored
+        # test case or chosen in another state may carry bounds of widgets that have moved since, so they are located
+        bounds_are_current = self.observed_state_id is not None and \
+            event["precondition"]["stateId"] == self.observed_state_id
+        if not (self.batch_actions and bounds_are_current and self._execute_batch(actions)):
+            for action in actions:
+                self._execute_action(action, self.tap_by_coordinates and bounds_are_current)
+
+        return abstraction.Event(dict(event, actions=actions))
+
+    def _execute_batch(self, actions):
+        # sends a multi-action event as a single W3C actions request where the backend supports it
+        if len(actions) < 2 or not getattr(self.driver, "w3c", False):
+            return False
+
+        input_actions = compile_input_actions(actions)
+        if input_actions is None:
+            return False
+
+        # The request is validated before any input is dispatched, so a rejected request means nothing has run and
+        # the actions can be executed one by one. Any other error may come after part of the batch was performed, and
+        # running the actions again would repeat those inputs, so it fails the event like a failed action would.
+        try:
+            self.driver.execute(Command.W3C_ACTIONS, input_actions)
+        except (InvalidArgumentException, UnknownMethodException) as e:
+            logger.debug("Batched actions were rejected, executing them one by one: {}".format(e))
+            return False
+
+        return True
+
+    def _wait_for_ui_to_settle(self):
+        if self.settle_wait is None:
+            time.sleep(self.event_interval)
+            settle_time = self.event_interval
+        else:
+            settle_time = self.settle_wait.wait(self.driver, self.event_interval)
+
+        self._record_settle_time(settle_time)
+
+    def _record_settle_time(self, settle_time):
+        self.settle_times.append(settle_time)
+        logger.debug("UI settled after {:.3f} seconds.".format(settle_time))
+
+    def _execute_action(self, action, by_coordinates=False):
+        if by_coordinates and self._execute_at_bounds(action):
+            return
+
+        action.execute(self.driver, self.session_cache)
+
+    def _execute_at_bounds(self, action):
+        # only called for events from the latest observed snapshot; with a session cache, bounds outside the current
+        # window (e.g. after a rotation) are located instead, and a tap the driver rejects is retried through the
+        # locator
+        if not self._bounds_are_on_screen(action):
+            return False
+
+        try:
+            return action.execute_at_bounds(self.driver)
+        except WebDriverException as e:
+            logger.debug("Could not act on {} by coordinates, locating it instead: {}".format(
+                action.target["description"], e))
+            return False
+
+    def _bounds_are_on_screen(self, action):
+        bounds_center = action.get_bounds_center()
+        if self.session_cache is None or bounds_center is None:
+            return True
+
+        window_size = self.session_cache.get_window_size(self.driver)
+        return 0 <= bounds_center[0] < window_size["width"] and 0 <= bounds_center[1] < window_size["height"]
+
+
+class AsyncExecutor(object):
+    # Runs events through an Executor without blocking the event loop: the driver calls run in a thread pool and the
+    # wait after each event is a coroutine, so one process can drive many sessions at once.
+    def __init__(self, executor, thread_pool=None):
+        self.executor = executor
+        self.thread_pool = thread_pool
 
-            action.execute(self.driver)
+    @property
+    def driver(self):
+        return self.executor.driver
 
-        time.sleep(self.event_interval)
+    @property
+    def settle_times(self):
+        return self.executor.settle_times
 
+    def observe_snapshot(self, snapshot):
+        self.executor.observe_snapshot(snapshot)
 
+    async def execute(self, event):
+        loop = asyncio.get_running_loop()
+        executed_event = await loop.run_in_executor(self.thread_pool, self.executor._execute_event_actions, event)
+        await self._wait_for_ui_to_settle()
+        return executed_event
 
+    async def _wait_for_ui_to_settle(self):
+        event_interval = self.executor.event_interval
+        settle_wait = self.executor.settle_wait
+        if settle_wait is None:
+            await asyncio.sleep(event_interval)
+            settle_time = event_interval
+        else:
+            settle_time = await settle_wait.wait_async(self.executor.driver, event_interval, self.thread_pool)
 
+        self.executor._record_settle_time(settle_time)
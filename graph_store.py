@@ -0,0 +1,180 @@
+import json
+import logging
+import sqlite3
+import threading
+
+import abstraction
+from hashing import generate_event_hash
+
+logger = logging.getLogger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS states (
+    state_id TEXT PRIMARY KEY,
+    activity_name TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    event_hash TEXT PRIMARY KEY,
+    state_id TEXT,
+    event_json TEXT NOT NULL,
+    execution_count INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS events_by_state ON events (state_id);
+CREATE INDEX IF NOT EXISTS unexplored_events ON events (state_id) WHERE execution_count = 0;
+CREATE TABLE IF NOT EXISTS transitions (
+    event_hash TEXT NOT NULL,
+    source_state_id TEXT,
+    target_state_id TEXT NOT NULL,
+    observation_count INTEGER NOT NULL DEFAULT 0,
+    latency_count INTEGER NOT NULL DEFAULT 0,
+    total_latency REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (event_hash, target_state_id)
+);
+CREATE INDEX IF NOT EXISTS transitions_by_source ON transitions (source_state_id);
+CREATE INDEX IF NOT EXISTS transitions_by_target ON transitions (target_state_id);
+"""
+
+
+def create_graph_store(database_path=":memory:"):
+    return GraphStore(database_path)
+
+
+class GraphStore(object):
+    # Persists the event-flow graph: states keyed by stateId, partial events keyed by their event hash and the
+    # transitions observed when synthesized events were executed. Repeated observations of the same transition are
+    # folded into one row that keeps a count and the mean latency.
+    def __init__(self, database_path=":memory:"):
+        self.database_path = database_path
+        self.connection = sqlite3.connect(database_path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self.connection:
+            self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def add_state(self, state):
+        with self._lock, self.connection:
+            self._insert_state(state)
+
+    def add_events(self, events):
+        # stores the events available in a state; events already in the store keep their execution counts
+        with self._lock, self.connection:
+            for event in events:
+                self._insert_event(event)
+
+    def add_transition(self, event, latency=None):
+        self.add_transitions([(event, latency)])
+
+    def add_transitions(self, observations):
+        # observations are (synthesized event, latency in seconds or None) pairs, written in a single transaction
+        with self._lock, self.connection:
+            for event, latency in observations:
+                self._insert_transition(event, latency)
+
+    def get_state(self, state_id):
+        rows = self._query("SELECT state_id, activity_name FROM states WHERE state_id = ?", (state_id,))
+        if not rows:
+            return None
+
+        return abstraction.create_state(rows[0][1], rows[0][0])
+
+    def get_event(self, event_hash):
+        rows = self._query("SELECT event_json FROM events WHERE event_hash = ?", (event_hash,))
+        if not rows:
+            return None
+
+        return abstraction.make_event_executable(json.loads(rows[0][0]))
+
+    def get_outgoing_events(self, state_id):
+        rows = self._query("SELECT event_json FROM events WHERE state_id = ? ORDER BY event_hash", (state_id,))
+        return [abstraction.make_event_executable(json.loads(row[0])) for row in rows]
+
+    def get_unexplored_events(self, state_id=None, limit=None):
+        if state_id is None:
+            query = "SELECT event_json FROM events WHERE execution_count = 0"
+            parameters = ()
+        else:
+            query = "SELECT event_json FROM events WHERE state_id = ? AND execution_count = 0"
+            parameters = (state_id,)
+        if limit is not None:
+            query += " LIMIT ?"
+            parameters += (limit,)
+
+        return [abstraction.make_event_executable(json.loads(row[0]))
+                for row in self._query(query, parameters)]
+
+    def get_transitions(self, source_state_id):
+        # (event hash, target state id, observation count, mean latency or None) for every transition out of a state
+        rows = self._query(
+            "SELECT event_hash, target_state_id, observation_count, total_latency, latency_count FROM transitions "
+            "WHERE source_state_id = ? ORDER BY event_hash, target_state_id", (source_state_id,))
+        return [(event_hash, target_state_id, observation_count,
+                 total_latency / latency_count if latency_count else None)
+                for event_hash, target_state_id, observation_count, total_latency, latency_count in rows]
+
+    def get_predecessor_states(self, state_id):
+        rows = self._query(
+            "SELECT DISTINCT source_state_id FROM transitions WHERE target_state_id = ? AND source_state_id != ? "
+            "ORDER BY source_state_id", (state_id, state_id))
+        return [row[0] for row in rows]
+
+    def get_states_reaching(self, state_id):
+        # every state with a path of observed transitions to the given state
+        rows = self._query(
+            "WITH RECURSIVE reaching(state_id) AS ("
+            "SELECT source_state_id FROM transitions WHERE target_state_id = ? "
+            "UNION SELECT transitions.source_state_id FROM transitions "
+            "JOIN reaching ON transitions.target_state_id = reaching.state_id) "
+            "SELECT state_id FROM reaching WHERE state_id != ? ORDER BY state_id", (state_id, state_id))
+        return [row[0] for row in rows]
+
+    def get_counts(self):
+        return {
+            "states": self._query("SELECT COUNT(*) FROM states")[0][0],
+            "events": self._query("SELECT COUNT(*) FROM events")[0][0],
+            "transitions": self._query("SELECT COUNT(*) FROM transitions")[0][0]
+        }
+
+    def _query(self, query, parameters=()):
+        with self._lock:
+            return self.connection.execute(query, parameters).fetchall()
+
+    def _insert_state(self, state):
+        if state is None or state["stateId"] is None:
+            return
+
+        self.connection.execute("INSERT OR IGNORE INTO states (state_id, activity_name) VALUES (?, ?)",
+                                (state["stateId"], state["activityName"]))
+
+    def _insert_event(self, event):
+        precondition = event["precondition"]
+        self._insert_state(precondition)
+        serializable_event = abstraction.create_serializable_event(event)
+        serializable_event.pop("postcondition", None)
+        event_hash = generate_event_hash(event)
+        self.connection.execute("INSERT OR IGNORE INTO events (event_hash, state_id, event_json) VALUES (?, ?, ?)",
+                                (event_hash, precondition["stateId"], json.dumps(serializable_event)))
+        return event_hash
+
+    def _insert_transition(self, event, latency):
+        postcondition = event["postcondition"]
+        self._insert_state(postcondition)
+        event_hash = self._insert_event(event)
+        self.connection.execute("UPDATE events SET execution_count = execution_count + 1 WHERE event_hash = ?",
+                                (event_hash,))
+        self.connection.execute("INSERT OR IGNORE INTO transitions (event_hash, source_state_id, target_state_id) "
+                                "VALUES (?, ?, ?)",
+                                (event_hash, event["precondition"]["stateId"], postcondition["stateId"]))
+        self.connection.execute(
+            "UPDATE transitions SET observation_count = observation_count + 1, "
+            "latency_count = latency_count + ?, total_latency = total_latency + ? "
+            "WHERE event_hash = ? AND target_state_id = ?",
+            (0 if latency is None else 1, latency or 0.0, event_hash, postcondition["stateId"]))
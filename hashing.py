@@ -1,5 +1,10 @@
 import json
 import hashlib
+from functools import lru_cache
+from json.encoder import encode_basestring_ascii
+from appiumatic.constants import HashAlgorithm, Phase
+from exceptions import InvalidParameter
+import instrumentation
 
 
 def _get_hash_target(action):
@@ -35,32 +40,108 @@ def _get_hash_event(event):
     return hash_event
 
 
-def generate_state_hash(actions):
+def _encode_hash_value(value):
+    if isinstance(value, str):
+        return encode_basestring_ascii(value)
+
+    return json.dumps(value)
+
+
+def _get_hash_action_source(action):
+    return _encode_hash_key(action.hash_key)
+
+
+@lru_cache(maxsize=65536)
+def _encode_hash_key(hash_key):
+    # the same text json.dumps(_get_hash_action(...), sort_keys=True) produces, without building the dicts
+    action_type, selector, selector_value, state, target_type = hash_key
+    return '{"target": {"selector": %s, "selectorValue": %s, "state": %s, "type": %s}, "type": %s}' % (
+        _encode_hash_value(selector), _encode_hash_value(selector_value), _encode_hash_value(state),
+        _encode_hash_value(target_type), _encode_hash_value(action_type))
+
+
+def _get_hash_event_source(event):
+    # the same text json.dumps(_get_hash_event(event), sort_keys=True) produces
+    hash_actions_source = ", ".join(_get_hash_action_source(action) for action in event["actions"])
+    precondition_source = json.dumps(event["precondition"], sort_keys=True)
+    return '{"actions": [%s], "precondition": %s}' % (hash_actions_source, precondition_source)
+
+
+def _get_state_hash_key(action):
+    return tuple(str(key_part) for key_part in action.hash_key)
+
+
+def get_event_key(event):
+    # events with equal keys have equal event hashes; unlike the hash, the key can be computed without serializing
+    precondition = event["precondition"]
+    return tuple(action.hash_key for action in event["actions"]), tuple(sorted(precondition.items()))
+
+
+def generate_state_hash(actions, algorithm=HashAlgorithm.SHA1):
     # the order of the actions does not matter
-    hash_source = []
-    for action in actions:
-        hash_target = _get_hash_target(action)
-        hash_action = _get_hash_action(action, hash_target)
-        hash_source.append(hash_action)
+    with instrumentation.phase(Phase.HASHING):
+        if algorithm == HashAlgorithm.SHA1:
+            return _generate_sha1_state_hash(actions)
+        if algorithm == HashAlgorithm.BLAKE2B:
+            return _generate_blake2b_state_hash(actions)
 
-    hash_source.sort(key=lambda the_action: the_action["type"] + "@" + the_action["target"]["selector"] +
-                     "=" + the_action["target"]["selectorValue"])
-    json_hash_source = json.dumps(hash_source, sort_keys=True)
-    return hashlib.sha1(json_hash_source.encode("utf-8")).hexdigest()
+    raise InvalidParameter("Unknown hash algorithm: {}".format(algorithm))
 
 
-def generate_test_case_hash(events):
-    hash_source = []
-    for event in events:
-        hash_event = _get_hash_event(event)
-        hash_source.append(hash_event)
+def _generate_sha1_state_hash(actions):
+    # compatible with the ids of existing suites: the hash covers the JSON list of hash actions, sorted as before
+    sorted_actions = sorted(actions, key=lambda the_action: the_action.action_type + "@" +
+                            the_action.target["selector"] + "=" + the_action.target["selectorValue"])
+    state_hash = hashlib.sha1(b"[")
+    separator = b""
+    for action in sorted_actions:
+        state_hash.update(separator)
+        state_hash.update(_get_hash_action_source(action).encode("utf-8"))
+        separator = b", "
+    state_hash.update(b"]")
+    return state_hash.hexdigest()
+
+
+def _generate_blake2b_state_hash(actions):
+    state_hash = hashlib.blake2b(digest_size=20)
+    for hash_key in sorted(_get_state_hash_key(action) for action in actions):
+        state_hash.update("\x1f".join(hash_key).encode("utf-8"))
+        state_hash.update(b"\x1e")
+    return state_hash.hexdigest()
 
-    json_hash_source = json.dumps(hash_source, sort_keys=True)
-    return hashlib.sha1(json_hash_source.encode("utf-8")).hexdigest()
+
+def generate_test_case_hash(events):
+    hash_source = "[%s]" % ", ".join(_get_hash_event_source(event) for event in events)
+    return hashlib.sha1(hash_source.encode("utf-8")).hexdigest()
 
 
 def generate_event_hash(event):
     # the order of the actions matters
-    hash_event = _get_hash_event(event)
-    json_hash_source = json.dumps(hash_event, sort_keys=True)
-    return hashlib.sha1(json_hash_source.encode("utf-8")).hexdigest()
+    hash_source = _get_hash_event_source(event)
+    return hashlib.sha1(hash_source.encode("utf-8")).hexdigest()
+
+
+def create_test_case_hash_builder():
+    return TestCaseHashBuilder()
+
+
+class TestCaseHashBuilder(object):
+    # Hashes a test case one event at a time. The digest state of a prefix is kept, so extending a prefix only hashes
+    # the new event, and prefixes can be shared between test cases. The ids match generate_test_case_hash.
+    def __init__(self, prefix_hash=None, length=0):
+        if prefix_hash is None:
+            prefix_hash = hashlib.sha1(b"[")
+        self._prefix_hash = prefix_hash
+        self.length = length
+
+    def extend(self, event):
+        extended_hash = self._prefix_hash.copy()
+        if self.length > 0:
+            extended_hash.update(b", ")
+        extended_hash.update(_get_hash_event_source(event).encode("utf-8"))
+        return TestCaseHashBuilder(extended_hash, self.length + 1)
+
+    def hexdigest(self):
+        test_case_hash = self._prefix_hash.copy()
+        test_case_hash.update(b"]")
+        return test_case_hash.hexdigest()
@@ -0,0 +1,130 @@
+import logging
+import math
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+_sink = None
+_local = threading.local()
+
+
+def set_sink(sink):
+    # sink is a callable receiving one record per step, or None to disable instrumentation
+    global _sink
+    _sink = sink
+    _local.__dict__.clear()
+
+
+def is_enabled():
+    return _sink is not None
+
+
+def phase(name):
+    if _sink is None:
+        return _DISABLED_PHASE
+    return _PhaseTimer(_get_step_record(), name)
+
+
+def record_count(name, count):
+    if _sink is None:
+        return
+    step_record = _get_step_record()
+    step_record[name] = step_record.get(name, 0) + count
+
+
+def end_step():
+    # hands the current thread's record to the sink; the next phase starts a new step
+    step_record = getattr(_local, "step_record", None)
+    _local.step_record = None
+    if _sink is None or step_record is None:
+        return
+    _sink(step_record)
+
+
+def create_step_record():
+    return {
+        "phases": {},
+        "nodeCount": 0,
+        "actionCount": 0
+    }
+
+
+def _get_step_record():
+    step_record = getattr(_local, "step_record", None)
+    if step_record is None:
+        step_record = create_step_record()
+        _local.step_record = step_record
+    return step_record
+
+
+def log_sink(step_record):
+    logger.info("Step timings: {}".format(step_record))
+
+
+class _DisabledPhase(object):
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False
+
+
+_DISABLED_PHASE = _DisabledPhase()
+
+
+class _PhaseTimer(object):
+    # durations of a phase entered several times in one step are added up; phases may nest, e.g. elementLookup is
+    # also counted in actions
+    __slots__ = ("step_record", "name", "start_time")
+
+    def __init__(self, step_record, name):
+        self.step_record = step_record
+        self.name = name
+
+    def __enter__(self):
+        self.start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        phases = self.step_record["phases"]
+        phases[self.name] = phases.get(self.name, 0.0) + time.perf_counter() - self.start_time
+        return False
+
+
+class PhaseAggregator(object):
+    # a sink that keeps every phase duration and reports percentiles per phase
+
+    def __init__(self):
+        self.durations = {}
+        self.step_count = 0
+        self._lock = threading.Lock()
+
+    def __call__(self, step_record):
+        with self._lock:
+            self.step_count += 1
+            for name, duration in step_record["phases"].items():
+                self.durations.setdefault(name, []).append(duration)
+
+    def get_percentiles(self, percentiles=(50, 95, 99)):
+        with self._lock:
+            durations = {name: sorted(values) for name, values in self.durations.items()}
+
+        return {name: {"p{}".format(percentile): _get_percentile(values, percentile) for percentile in percentiles}
+                for name, values in durations.items()}
+
+    def report(self):
+        lines = ["{:<16} {:>10} {:>10} {:>10}".format("phase", "p50 (ms)", "p95 (ms)", "p99 (ms)")]
+        for name, percentiles in sorted(self.get_percentiles().items()):
+            lines.append("{:<16} {:>10.2f} {:>10.2f} {:>10.2f}".format(name, percentiles["p50"] * 1000,
+                                                                       percentiles["p95"] * 1000,
+                                                                       percentiles["p99"] * 1000))
+        return "\n".join(lines)
+
+
+def _get_percentile(sorted_values, percentile):
+    # nearest-rank percentile
+    rank = max(1, int(math.ceil(percentile / 100 * len(sorted_values))))
+    return sorted_values[rank - 1]
@@ -0,0 +1,108 @@
+import heapq
+import logging
+import time
+
+import abstraction
+import ui_analysis
+
+logger = logging.getLogger(__name__)
+
+
+def create_navigator(graph_store, executor, default_latency=1.0, max_replans=3):
+    return Navigator(graph_store, executor, default_latency, max_replans)
+
+
+def find_path(graph_store, source_state_id, target_state_id, default_latency=1.0):
+    # Dijkstra over the recorded transitions, weighted by their mean latency; transitions without a measured latency
+    # cost default_latency. Returns a list of (event hash, expected state id) steps, or None if the target is
+    # unreachable.
+    if source_state_id == target_state_id:
+        return []
+
+    costs = {source_state_id: 0.0}
+    previous_steps = {}
+    frontier = [(0.0, source_state_id)]
+    while frontier:
+        cost, state_id = heapq.heappop(frontier)
+        if state_id == target_state_id:
+            return _get_steps(previous_steps, target_state_id)
+        if cost > costs[state_id]:
+            continue
+
+        transitions = graph_store.get_transitions(state_id)
+        event_observation_counts = {}
+        for event_hash, next_state_id, observation_count, mean_latency in transitions:
+            event_observation_counts[event_hash] = event_observation_counts.get(event_hash, 0) + observation_count
+
+        for event_hash, next_state_id, observation_count, mean_latency in transitions:
+            # an event that only sometimes leads to next_state_id costs proportionally more
+            latency = default_latency if mean_latency is None else mean_latency
+            next_cost = cost + latency * event_observation_counts[event_hash] / max(observation_count, 1)
+            if next_cost < costs.get(next_state_id, float("inf")):
+                costs[next_state_id] = next_cost
+                previous_steps[next_state_id] = (state_id, event_hash)
+                heapq.heappush(frontier, (next_cost, next_state_id))
+
+    return None
+
+
+def _get_steps(previous_steps, target_state_id):
+    steps = []
+    state_id = target_state_id
+    while state_id in previous_steps:
+        previous_state_id, event_hash = previous_steps[state_id]
+        steps.append((event_hash, state_id))
+        state_id = previous_state_id
+
+    steps.reverse()
+    return steps
+
+
+class Navigator(object):
+    # Drives the app to a recorded state along the cheapest known path instead of relaunching and replaying a whole
+    # prefix. Every executed step is recorded in the graph store with its latency, so the graph improves as it is
+    # used; when the app ends up somewhere unexpected the path is planned again from the observed state.
+    def __init__(self, graph_store, executor, default_latency=1.0, max_replans=3):
+        self.graph_store = graph_store
+        self.executor = executor
+        self.default_latency = default_latency
+        self.max_replans = max_replans
+        self.executed_event_count = 0
+
+    def navigate(self, target_state_id, current_state=None):
+        if current_state is None:
+            current_state = ui_analysis.get_current_state(self.executor.driver)
+
+        replans = 0
+        while current_state["stateId"] != target_state_id:
+            steps = find_path(self.graph_store, current_state["stateId"], target_state_id, self.default_latency)
+            if steps is None:
+                logger.info("No known path from {} to {}.".format(current_state["stateId"], target_state_id))
+                return False
+
+            current_state, diverged = self._follow(steps)
+            if diverged:
+                replans += 1
+                if replans > self.max_replans:
+                    logger.info("Giving up on reaching {} after {} replans.".format(target_state_id, replans - 1))
+                    return False
+
+        return True
+
+    def _follow(self, steps):
+        current_state = None
+        for event_hash, expected_state_id in steps:
+            event = self.graph_store.get_event(event_hash)
+            start_time = time.perf_counter()
+            executed_event = self.executor.execute(event)
+            current_state = ui_analysis.get_current_state(self.executor.driver)
+            latency = time.perf_counter() - start_time
+            self.executed_event_count += 1
+            self.graph_store.add_transition(abstraction.synthesize(executed_event, current_state), latency)
+
+            if current_state["stateId"] != expected_state_id:
+                logger.debug("Expected {} but reached {}, planning again.".format(expected_state_id,
+                                                                                   current_state["stateId"]))
+                return current_state, True
+
+        return current_state, False
@@ -0,0 +1,230 @@
+import io
+import json
+import logging
+import os
+import threading
+import time
+
+from lxml import etree
+from appium.webdriver.mobilecommand import MobileCommand
+from selenium.common.exceptions import NoSuchElementException, WebDriverException
+
+import abstraction
+
+logger = logging.getLogger(__name__)
+
+
+def load_recording(recording_path):
+    # page sources may be stored inline or as separate files next to the recording
+    with open(recording_path) as recording_file:
+        recording = json.load(recording_file)
+
+    recording_dir = os.path.dirname(os.path.abspath(recording_path))
+    for state in recording["states"].values():
+        if "pageSourceFile" in state:
+            with open(os.path.join(recording_dir, state.pop("pageSourceFile")), encoding="utf-8") as page_source_file:
+                state["pageSource"] = page_source_file.read()
+
+    return recording
+
+
+def save_recording(recording, recording_path):
+    with open(recording_path, "w") as recording_file:
+        json.dump(recording, recording_file, indent=2)
+
+
+def create_recording(initial_state, states, transitions):
+    # states: {state name: (activity, page source)}, transitions: {state name: {input key: next state name}}
+    return {
+        "initialState": initial_state,
+        "states": {name: {"activity": activity, "pageSource": page_source}
+                   for name, (activity, page_source) in states.items()},
+        "transitions": transitions
+    }
+
+
+def create_replay_driver(recording_path, latency=0.0, window_size=None):
+    return ReplayDriver(load_recording(recording_path), latency, window_size)
+
+
+def get_click_key(locator):
+    return "click:" + locator
+
+
+def get_long_click_key(locator):
+    return "longClick:" + locator
+
+
+def get_text_entry_key(locator):
+    return "sendKeys:" + locator
+
+
+def get_keycode_key(key_code):
+    return "keycode:{}".format(key_code)
+
+
+def get_swipe_key(direction):
+    return "swipe:" + direction
+
+
+BACKGROUND_KEY = "background"
+
+
+class ReplayDriver(object):
+    # An in-process stand-in for an Appium driver that replays a recorded app as a state machine. Each state has an
+    # activity and a page source; transitions map input keys (see the get_*_key functions) to the next state and
+    # inputs without a recorded transition leave the state unchanged. Every round trip sleeps for `latency` seconds.
+    w3c = False
+
+    def __init__(self, recording, latency=0.0, window_size=None):
+        self.recording = recording
+        self.latency = latency
+        self.window_size = window_size or {"width": 768, "height": 1280}
+        self.current_state = recording["initialState"]
+        self.inputs = []
+        self._xml_trees = {}
+        self._lock = threading.RLock()
+
+    @property
+    def page_source(self):
+        self._simulate_latency()
+        return self.recording["states"][self.current_state]["pageSource"]
+
+    @property
+    def current_activity(self):
+        self._simulate_latency()
+        return self.recording["states"][self.current_state]["activity"]
+
+    def find_element_by_id(self, resource_id):
+        self._simulate_latency()
+        elements = self._get_xml_tree().xpath("//*[@resource-id=$resource_id]", resource_id=resource_id)
+        if len(elements) == 0:
+            raise NoSuchElementException("No element with id {} in state {}.".format(resource_id, self.current_state))
+        return ReplayElement(self, resource_id)
+
+    def find_element_by_xpath(self, xpath):
+        self._simulate_latency()
+        if len(self._get_xml_tree().xpath(xpath)) == 0:
+            raise NoSuchElementException("No element at {} in state {}.".format(xpath, self.current_state))
+        return ReplayElement(self, xpath)
+
+    def press_keycode(self, key_code):
+        self._simulate_latency()
+        self.perform_input(get_keycode_key(key_code))
+
+    def swipe(self, start_x, start_y, end_x, end_y, duration=None):
+        self._simulate_latency()
+        if abs(end_x - start_x) > abs(end_y - start_y):
+            direction = "left" if end_x < start_x else "right"
+        else:
+            direction = "up" if end_y < start_y else "down"
+        self.perform_input(get_swipe_key(direction))
+
+    def tap(self, positions, duration=None):
+        self._simulate_latency()
+        x, y = positions[0]
+        self.perform_input(get_click_key(self._get_locator_at(x, y)))
+
+    def background_app(self, seconds):
+        self._simulate_latency()
+        self.perform_input(BACKGROUND_KEY)
+
+    def get_window_size(self):
+        self._simulate_latency()
+        return dict(self.window_size)
+
+    def execute(self, driver_command, params=None):
+        self._simulate_latency()
+        if driver_command != MobileCommand.TOUCH_ACTION:
+            raise WebDriverException("Command {} is not supported by the replay driver.".format(driver_command))
+
+        for touch_action in params["actions"]:
+            if touch_action["action"] != "longPress":
+                continue
+            options = touch_action["options"]
+            if options.get("element") is not None:
+                locator = options["element"]
+            else:
+                locator = self._get_locator_at(options["x"], options["y"])
+            self.perform_input(get_long_click_key(locator))
+
+        return {"value": None}
+
+    def launch_app(self):
+        self._simulate_latency()
+        self.reset()
+
+    def close_app(self):
+        self._simulate_latency()
+
+    def start_activity(self, app_package, app_activity, **options):
+        self._simulate_latency()
+        self.reset()
+
+    def execute_script(self, script, *args):
+        self._simulate_latency()
+
+    def quit(self):
+        pass
+
+    def reset(self):
+        with self._lock:
+            self.current_state = self.recording["initialState"]
+
+    def perform_input(self, input_key):
+        with self._lock:
+            self.inputs.append(input_key)
+            transitions = self.recording["transitions"].get(self.current_state, {})
+            next_state = transitions.get(input_key)
+            if next_state is not None:
+                logger.debug("Replaying {}: {} -> {}".format(input_key, self.current_state, next_state))
+                self.current_state = next_state
+
+    def _get_xml_tree(self):
+        state_name = self.current_state
+        xml_tree = self._xml_trees.get(state_name)
+        if xml_tree is None:
+            page_source = self.recording["states"][state_name]["pageSource"]
+            xml_tree = etree.parse(io.BytesIO(page_source.encode("utf-8")))
+            self._xml_trees[state_name] = xml_tree
+        return xml_tree
+
+    def _get_locator_at(self, x, y):
+        # the deepest element containing the point, located the same way snapshot targets are
+        xml_tree = self._get_xml_tree()
+        hit_element = None
+        for element in xml_tree.getroot().iter("*"):
+            bounds = abstraction.get_widget_bounds(element)
+            if bounds is None:
+                continue
+            left, top, right, bottom = bounds
+            if left <= x < right and top <= y < bottom:
+                hit_element = element
+
+        if hit_element is None:
+            return ""
+
+        selector, selector_value = abstraction._get_widget_selector(xml_tree, hit_element)
+        return selector_value
+
+    def _simulate_latency(self):
+        if self.latency > 0:
+            time.sleep(self.latency)
+
+
+class ReplayElement(object):
+
+    def __init__(self, driver, locator):
+        self.driver = driver
+        self.id = locator
+
+    def click(self):
+        self.driver._simulate_latency()
+        self.driver.perform_input(get_click_key(self.id))
+
+    def send_keys(self, *value):
+        self.driver._simulate_latency()
+        self.driver.perform_input(get_text_entry_key(self.id))
+
+    def clear(self):
+        self.driver._simulate_latency()
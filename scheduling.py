@@ -0,0 +1,96 @@
+import logging
+import queue
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import abstraction
+import ui_analysis
+from hashing import generate_event_hash
+
+logger = logging.getLogger(__name__)
+
+
+def create_scheduler(executors):
+    return ExplorationScheduler(executors)
+
+
+def explore_episode(executor, episode_length, rng=random):
+    # a random walk from the current screen; returns the completed events in the order they were executed
+    completed_events = []
+    snapshot = ui_analysis.get_ui_snapshot(executor.driver)
+    executor.observe_snapshot(snapshot)
+    for step in range(episode_length):
+        available_events = ui_analysis.get_snapshot_events(snapshot)
+        selected_event = rng.choice(available_events)
+        executed_event = executor.execute(selected_event)
+        snapshot = ui_analysis.get_ui_snapshot(executor.driver)
+        executor.observe_snapshot(snapshot)
+        completed_events.append(abstraction.synthesize(executed_event, snapshot["state"]))
+        if snapshot["state"] == abstraction.create_crash_state():
+            break
+
+    return completed_events
+
+
+def replay_test_case(executor, test_case):
+    completed_events = []
+    for event in test_case:
+        executed_event = executor.execute(event)
+        current_state = ui_analysis.get_current_state(executor.driver)
+        completed_events.append(abstraction.synthesize(executed_event, current_state))
+
+    return completed_events
+
+
+class ExplorationScheduler(object):
+    # Hands jobs to whichever executor (device) is free and merges what they find. A job is a callable that takes an
+    # executor and returns the completed events it executed, e.g. explore_episode or replay_test_case bound with
+    # functools.partial. States are deduplicated by state id and events by their event hash across all devices.
+    def __init__(self, executors):
+        self.executors = list(executors)
+        self.states = {}
+        self.events = {}
+        self.failures = []
+        self._free_executors = queue.Queue()
+        for executor in self.executors:
+            self._free_executors.put(executor)
+        self._lock = threading.Lock()
+
+    def run(self, jobs):
+        # returns one entry per job, in job order: its completed events, or None if the job failed; failed jobs are
+        # logged and recorded in failures with the executor they ran on, and do not stop the other jobs
+        with ThreadPoolExecutor(max_workers=len(self.executors)) as thread_pool:
+            futures = [thread_pool.submit(self._run_job, job) for job in jobs]
+            return [future.result() for future in futures]
+
+    def _run_job(self, job):
+        executor = self._free_executors.get()
+        try:
+            completed_events = job(executor)
+        except Exception as e:
+            logger.exception("Job failed on {}: {}".format(executor.driver, e))
+            with self._lock:
+                self.failures.append((executor, e))
+            return None
+        finally:
+            self._free_executors.put(executor)
+
+        new_event_count = self.record(completed_events)
+        logger.debug("Job finished with {} events, {} of them new.".format(len(completed_events), new_event_count))
+        return completed_events
+
+    def record(self, completed_events):
+        new_event_count = 0
+        with self._lock:
+            for event in completed_events:
+                for state in (event["precondition"], event.get("postcondition")):
+                    if state is not None and state["stateId"] is not None:
+                        self.states.setdefault(state["stateId"], state)
+
+                event_hash = generate_event_hash(event)
+                if event_hash not in self.events:
+                    self.events[event_hash] = event
+                    new_event_count += 1
+
+        return new_event_count
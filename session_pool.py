@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+from contextlib import contextmanager
+
+from selenium.common.exceptions import WebDriverException
+
+from exceptions import SessionPoolClosed
+from execution import create_executor
+
+logger = logging.getLogger(__name__)
+
+_POOL_CHANGED = object()
+
+
+def create_session_pool(create_session, size, app_package=None, app_activity=None, clear_data=False):
+    return SessionPool(create_session, size, app_package, app_activity, clear_data)
+
+
+class SessionPool(object):
+    # Keeps up to `size` driver sessions warm and resets the app between leases instead of creating a new session for
+    # every test case. create_session is a callable returning a new driver, e.g.
+    # functools.partial(webdriver.Remote, "http://localhost:4723/wd/hub", desired_caps).
+    def __init__(self, create_session, size, app_package=None, app_activity=None, clear_data=False):
+        if clear_data and app_package is None:
+            raise ValueError("app_package is required to clear app data.")
+
+        self.create_session = create_session
+        self.size = size
+        self.app_package = app_package
+        self.app_activity = app_activity
+        self.clear_data = clear_data
+        self.sessions = []
+        self._free_sessions = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    @contextmanager
+    def lease(self):
+        driver = self._acquire()
+        try:
+            self.reset_app(driver)
+        except WebDriverException as e:
+            logger.warning("Could not reset app, replacing session: {}".format(e))
+            driver = self._replace(driver)
+        except BaseException:
+            self._release(driver)
+            raise
+
+        try:
+            yield driver
+        except WebDriverException:
+            self._discard(driver)
+            raise
+        except BaseException:
+            self._release(driver)
+            raise
+        else:
+            self._release(driver)
+
+    @contextmanager
+    def lease_executor(self, event_interval, text_values, **executor_options):
+        with self.lease() as driver:
+            yield create_executor(driver, event_interval, text_values, **executor_options)
+
+    def reset_app(self, driver):
+        if self.clear_data:
+            driver.execute_script("mobile: shell", {"command": "pm", "args": ["clear", self.app_package]})
+        else:
+            driver.close_app()
+
+        if self.app_package is not None and self.app_activity is not None:
+            driver.start_activity(self.app_package, self.app_activity)
+        else:
+            driver.launch_app()
+
+    def close(self):
+        # quits every session; leases blocked waiting for a session are woken up and raise SessionPoolClosed
+        with self._lock:
+            self._closed = True
+            sessions, self.sessions = self.sessions, []
+        while True:
+            try:
+                self._free_sessions.get_nowait()
+            except queue.Empty:
+                break
+        self._free_sessions.put(_POOL_CHANGED)
+        for driver in sessions:
+            self._quit(driver)
+
+    def _acquire(self):
+        # _POOL_CHANGED on the queue wakes a waiting lease when a session was discarded or the pool was closed
+        while True:
+            with self._lock:
+                if self._closed:
+                    self._free_sessions.put(_POOL_CHANGED)
+                    raise SessionPoolClosed("The session pool is closed.")
+                can_create = len(self.sessions) < self.size and self._free_sessions.empty()
+                if can_create:
+                    self.sessions.append(None)
+
+            if can_create:
+                return self._create()
+
+            driver = self._free_sessions.get()
+            if driver is not _POOL_CHANGED:
+                return driver
+
+    def _create(self):
+        try:
+            driver = self.create_session()
+        except BaseException:
+            with self._lock:
+                self.sessions.remove(None)
+            self._free_sessions.put(_POOL_CHANGED)
+            raise
+
+        with self._lock:
+            self.sessions[self.sessions.index(None)] = driver
+        logger.info("Created session {} of {}.".format(len(self.sessions), self.size))
+        return driver
+
+    def _release(self, driver):
+        # sessions leased while the pool was closed have already been quit by close()
+        with self._lock:
+            if not self._closed:
+                self._free_sessions.put(driver)
+
+    def _replace(self, driver):
+        self._discard(driver)
+        replacement = self._acquire()
+        try:
+            self.reset_app(replacement)
+        except BaseException:
+            self._discard(replacement)
+            raise
+        return replacement
+
+    def _discard(self, driver):
+        with self._lock:
+            if driver in self.sessions:
+                self.sessions.remove(driver)
+        self._free_sessions.put(_POOL_CHANGED)
+        self._quit(driver)
+
+    @staticmethod
+    def _quit(driver):
+        try:
+            driver.quit()
+        except WebDriverException as e:
+            logger.warning("Could not quit session: {}".format(e))
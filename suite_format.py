@@ -0,0 +1,299 @@
+"""A compact, dictionary-encoded file format for generated test suites.
+
+Every distinct scalar (selector, description, activity name, text value, ...) is stored once in a value table, and
+targets, states, actions and events are stored once each as fixed-size records of little-endian uint32 references.
+A test case is a run of event references, so a prefix shared by many test cases costs four bytes per event. The
+tables are read in place from a memory map and records are only decoded when a test case is requested.
+
+Layout: header, value offsets, value blob, then the uint32 sections targets, states, actions, events, event actions,
+test case offsets and test case events."""
+
+import json
+import mmap
+import struct
+import sys
+from array import array
+
+import abstraction
+from exceptions import InvalidSuiteFormat
+
+_MAGIC = b"APSF"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHxx8I")
+_NONE = 0xFFFFFFFF
+_TARGET_FIELDS = 5
+_STATE_FIELDS = 2
+_ACTION_FIELDS = 3
+_EVENT_FIELDS = 4
+
+
+def write_suite(test_cases, suite_path):
+    # test_cases is a list of test cases, each a list of events holding either Action objects or action dicts
+    suite_encoder = _SuiteEncoder()
+    for test_case in test_cases:
+        suite_encoder.add_test_case(test_case)
+
+    with open(suite_path, "wb") as suite_file:
+        suite_encoder.write(suite_file)
+
+
+def open_suite(suite_path):
+    return SuiteReader(suite_path)
+
+
+def read_suite(suite_path):
+    with open_suite(suite_path) as suite_reader:
+        return list(suite_reader)
+
+
+def convert_json_to_suite(json_path, suite_path):
+    with open(json_path) as json_file:
+        test_cases = json.load(json_file)
+    write_suite(test_cases, suite_path)
+
+
+def convert_suite_to_json(suite_path, json_path):
+    test_cases = read_suite(suite_path)
+    with open(json_path, "w") as json_file:
+        json.dump(test_cases, json_file)
+
+
+def _get_serializable_event(event):
+    if any(not isinstance(action, dict) for action in event["actions"]):
+        return abstraction.create_serializable_event(event)
+    return event
+
+
+def _to_little_endian(values):
+    if sys.byteorder == "big":
+        values = array("I", values)
+        values.byteswap()
+    return values.tobytes()
+
+
+class _SuiteEncoder(object):
+
+    def __init__(self):
+        self.values = {}
+        self.targets = {}
+        self.states = {}
+        self.actions = {}
+        self.events = {}
+        self.event_records = array("I")
+        self.event_actions = array("I")
+        self.test_case_offsets = array("I", [0])
+        self.test_case_events = array("I")
+
+    def add_test_case(self, test_case):
+        for event in test_case:
+            self.test_case_events.append(self._add_event(_get_serializable_event(event)))
+        self.test_case_offsets.append(len(self.test_case_events))
+
+    def write(self, suite_file):
+        value_offsets = array("I", [0])
+        value_blob = bytearray()
+        for value_type, value in self.values:
+            value_blob += json.dumps(value).encode("utf-8")
+            value_offsets.append(len(value_blob))
+
+        suite_file.write(_HEADER.pack(_MAGIC, _VERSION, len(self.values), len(value_blob), len(self.targets),
+                                      len(self.states), len(self.actions), len(self.events),
+                                      len(self.event_actions), len(self.test_case_offsets) - 1))
+        suite_file.write(_to_little_endian(value_offsets))
+        suite_file.write(value_blob)
+        for records in (self.targets, self.states, self.actions):
+            suite_file.write(_to_little_endian(array("I", [field for record in records for field in record])))
+        for section in (self.event_records, self.event_actions, self.test_case_offsets, self.test_case_events):
+            suite_file.write(_to_little_endian(section))
+
+    def _add_value(self, value):
+        # scalars are stored as their JSON text so that ints, strings and None survive the round trip
+        if value is None:
+            return _NONE
+        value_key = (type(value), value)
+        value_id = self.values.get(value_key)
+        if value_id is None:
+            value_id = len(self.values)
+            self.values[value_key] = value_id
+        return value_id
+
+    def _add_state(self, state):
+        if state is None:
+            return _NONE
+        record = (self._add_value(state["activityName"]), self._add_value(state["stateId"]))
+        return self.states.setdefault(record, len(self.states))
+
+    def _add_target(self, target):
+        record = (self._add_value(target["selector"]), self._add_value(target["selectorValue"]),
+                  self._add_value(target["description"]), self._add_value(target["type"]),
+                  self._add_value(target["state"]))
+        return self.targets.setdefault(record, len(self.targets))
+
+    def _add_action(self, action_as_dict):
+        record = (self._add_value(action_as_dict["type"]), self._add_target(action_as_dict["target"]),
+                  self._add_value(action_as_dict["value"]))
+        return self.actions.setdefault(record, len(self.actions))
+
+    def _add_event(self, serializable_event):
+        action_ids = tuple(self._add_action(action_as_dict) for action_as_dict in serializable_event["actions"])
+        precondition_id = self._add_state(serializable_event["precondition"])
+        postcondition_id = self._add_state(serializable_event.get("postcondition"))
+        event_key = (precondition_id, postcondition_id, action_ids)
+        event_id = self.events.get(event_key)
+        if event_id is None:
+            event_id = len(self.events)
+            self.events[event_key] = event_id
+            self.event_records.extend((precondition_id, postcondition_id, len(self.event_actions), len(action_ids)))
+            self.event_actions.extend(action_ids)
+        return event_id
+
+
+class SuiteReader(object):
+    # Reads a suite written by write_suite from a memory map. Test cases come back in the JSON shape, i.e. events
+    # with action dicts, unless executable is requested, in which case the actions are rehydrated.
+    def __init__(self, suite_path):
+        self.suite_path = suite_path
+        self._suite_file = open(suite_path, "rb")
+        try:
+            self._buffer = mmap.mmap(self._suite_file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError:
+            self._suite_file.close()
+            raise InvalidSuiteFormat("{} is empty.".format(suite_path))
+
+        try:
+            self._read_sections()
+        except (struct.error, TypeError, ValueError) as e:
+            self.close()
+            raise InvalidSuiteFormat("{} is not a valid suite file: {}".format(suite_path, e))
+
+        self._value_cache = {}
+        self._state_cache = {}
+        self._target_cache = {}
+
+    def _read_sections(self):
+        magic, version, value_count, value_blob_size, target_count, state_count, action_count, event_count, \
+            event_action_count, test_case_count = _HEADER.unpack_from(self._buffer, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("unknown header {!r} version {}".format(magic, version))
+
+        offset = _HEADER.size
+        self._value_offsets, offset = self._read_uint32s(offset, value_count + 1)
+        self._value_blob_offset = offset
+        offset += value_blob_size
+        self._targets, offset = self._read_uint32s(offset, target_count * _TARGET_FIELDS)
+        self._states, offset = self._read_uint32s(offset, state_count * _STATE_FIELDS)
+        self._actions, offset = self._read_uint32s(offset, action_count * _ACTION_FIELDS)
+        self._events, offset = self._read_uint32s(offset, event_count * _EVENT_FIELDS)
+        self._event_actions, offset = self._read_uint32s(offset, event_action_count)
+        self._test_case_offsets, offset = self._read_uint32s(offset, test_case_count + 1)
+        self._test_case_events, offset = self._read_uint32s(offset, self._test_case_offsets[test_case_count])
+        if offset != len(self._buffer):
+            raise ValueError("expected {} bytes, found {}".format(offset, len(self._buffer)))
+
+    def _read_uint32s(self, offset, count):
+        end = offset + 4 * count
+        if end > len(self._buffer):
+            raise ValueError("section ends after the end of the file")
+
+        values = memoryview(self._buffer)[offset:end].cast("I")
+        if sys.byteorder == "big":
+            values = array("I", values)
+            values.byteswap()
+        return values, end
+
+    def close(self):
+        # memoryviews into the map must be released before it can be closed
+        for name in ("_value_offsets", "_targets", "_states", "_actions", "_events", "_event_actions",
+                     "_test_case_offsets", "_test_case_events"):
+            values = self.__dict__.pop(name, None)
+            if isinstance(values, memoryview):
+                values.release()
+        self._buffer.close()
+        self._suite_file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+        return False
+
+    def __len__(self):
+        return len(self._test_case_offsets) - 1
+
+    def __iter__(self):
+        for test_case_index in range(len(self)):
+            yield self.get_test_case(test_case_index)
+
+    def get_test_case(self, test_case_index, executable=False):
+        if not 0 <= test_case_index < len(self):
+            raise IndexError("Test case {} is out of range.".format(test_case_index))
+
+        start = self._test_case_offsets[test_case_index]
+        end = self._test_case_offsets[test_case_index + 1]
+        test_case = [self._get_event(event_id) for event_id in self._test_case_events[start:end]]
+        if executable:
+            return [abstraction.make_event_executable(event) for event in test_case]
+        return test_case
+
+    def _get_event(self, event_id):
+        record_offset = event_id * _EVENT_FIELDS
+        precondition_id, postcondition_id, first_action, action_count = self._events[record_offset:
+                                                                                     record_offset + _EVENT_FIELDS]
+        event = {
+            "precondition": self._get_state(precondition_id),
+            "actions": [self._get_action(action_id)
+                        for action_id in self._event_actions[first_action:first_action + action_count]]
+        }
+        if postcondition_id != _NONE:
+            event["postcondition"] = self._get_state(postcondition_id)
+        return event
+
+    def _get_action(self, action_id):
+        record_offset = action_id * _ACTION_FIELDS
+        type_id, target_id, value_id = self._actions[record_offset:record_offset + _ACTION_FIELDS]
+        return {
+            "target": dict(self._get_target(target_id)),
+            "type": self._get_value(type_id),
+            "value": self._get_value(value_id)
+        }
+
+    def _get_target(self, target_id):
+        target = self._target_cache.get(target_id)
+        if target is None:
+            record_offset = target_id * _TARGET_FIELDS
+            selector, selector_value, description, target_type, state = (
+                self._get_value(value_id) for value_id in self._targets[record_offset:record_offset + _TARGET_FIELDS])
+            target = {
+                "selector": selector,
+                "selectorValue": selector_value,
+                "description": description,
+                "type": target_type,
+                "state": state
+            }
+            self._target_cache[target_id] = target
+        return target
+
+    def _get_state(self, state_id):
+        if state_id == _NONE:
+            return None
+
+        state = self._state_cache.get(state_id)
+        if state is None:
+            record_offset = state_id * _STATE_FIELDS
+            activity_name_id, state_id_value_id = self._states[record_offset:record_offset + _STATE_FIELDS]
+            state = abstraction.create_state(self._get_value(activity_name_id), self._get_value(state_id_value_id))
+            self._state_cache[state_id] = state
+        return dict(state)
+
+    def _get_value(self, value_id):
+        if value_id == _NONE:
+            return None
+
+        value = self._value_cache.get(value_id, self)
+        if value is self:
+            start = self._value_blob_offset + self._value_offsets[value_id]
+            end = self._value_blob_offset + self._value_offsets[value_id + 1]
+            value = json.loads(self._buffer[start:end].decode("utf-8"))
+            self._value_cache[value_id] = value
+        return value
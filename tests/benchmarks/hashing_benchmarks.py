@@ -0,0 +1,38 @@
+"""Compares extending a test case hash with TestCaseHashBuilder against rehashing the whole test case. Run from the
+repository root with the package directory and tests/benchmarks on PYTHONPATH."""
+
+import timeit
+import abstraction
+import hashing
+from constants import *
+
+TEST_CASE_LENGTHS = [10, 100, 1000, 5000]
+EXTENSIONS = 200
+
+
+def _create_event(index):
+    target = abstraction.create_target(SelectorType.ID, "org.example:id/button_{}".format(index),
+                                       "Button {}".format(index), TargetType.BUTTON, TargetState.ENABLED)
+    precondition = abstraction.create_state("MainActivity", "state_{}".format(index))
+    return abstraction.create_partial_event(precondition, [abstraction.create_action(GUIActionType.CLICK, target)])
+
+
+def run():
+    print("{:>8} {:>22} {:>22}".format("events", "rehash (us/extension)", "builder (us/extension)"))
+    for test_case_length in TEST_CASE_LENGTHS:
+        prefix = [_create_event(index) for index in range(test_case_length)]
+        new_event = _create_event(test_case_length)
+        prefix_builder = hashing.create_test_case_hash_builder()
+        for event in prefix:
+            prefix_builder = prefix_builder.extend(event)
+
+        rehash_time = min(timeit.repeat(lambda: hashing.generate_test_case_hash(prefix + [new_event]),
+                                        number=EXTENSIONS, repeat=3))
+        builder_time = min(timeit.repeat(lambda: prefix_builder.extend(new_event).hexdigest(), number=EXTENSIONS,
+                                         repeat=3))
+        print("{:>8} {:>22.2f} {:>22.2f}".format(test_case_length, rehash_time / EXTENSIONS * 1e6,
+                                                 builder_time / EXTENSIONS * 1e6))
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,33 @@
+import random
+
+_NODE_TEMPLATE = '<{tag} index="{index}" text="{text}" class="{tag}" package="org.example" content-desc="" ' \
+                 'checkable="{checkable}" checked="false" clickable="{clickable}" enabled="true" focusable="false" ' \
+                 'focused="false" scrollable="{scrollable}" long-clickable="false" password="false" selected="false" ' \
+                 'bounds="[0,{top}][720,{bottom}]" resource-id="{resource_id}" instance="{index}"'
+
+
+def _create_node(tag, index, resource_id, clickable=False, checkable=False, scrollable=False, text=""):
+    return _NODE_TEMPLATE.format(tag=tag, index=index, text=text, resource_id=resource_id,
+                                 clickable=str(clickable).lower(), checkable=str(checkable).lower(),
+                                 scrollable=str(scrollable).lower(), top=index * 10, bottom=index * 10 + 10)
+
+
+def create_list_hierarchy(node_count, text_fields=0, scrollables=0, seed=0):
+    # a RecyclerView-like screen: rows of a layout, a title and a button sharing the same resource-ids
+    rng = random.Random(seed)
+    rows = []
+    row_count = max(1, (node_count - text_fields - scrollables) // 3)
+    for row in range(row_count):
+        title = _create_node("android.widget.TextView", 1, "org.example:id/row_title", text="Row {}".format(row))
+        button = _create_node("android.widget.Button", 2, "org.example:id/row_action", clickable=True,
+                              checkable=rng.random() < 0.1, text="Open")
+        rows.append('{}>{}/>{}/></android.widget.LinearLayout>'.format(
+            _create_node("android.widget.LinearLayout", row, ""), title, button))
+
+    for field in range(text_fields):
+        rows.append(_create_node("android.widget.EditText", field, "org.example:id/field_{}".format(field)) + "/>")
+
+    for scrollable in range(scrollables):
+        rows.append(_create_node("android.widget.ScrollView", scrollable, "", scrollable=True) + "/>")
+
+    return '<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0">{}</hierarchy>'.format("".join(rows))
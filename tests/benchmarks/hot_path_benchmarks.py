@@ -0,0 +1,136 @@
+"""Times the per-step analysis, abstraction and hashing functions over synthetic hierarchies and reports ops/sec and
+peak memory per call. Results can be saved as a JSON baseline and later runs compared against it, e.g.
+
+    python tests/benchmarks/hot_path_benchmarks.py --save baseline.json
+    python tests/benchmarks/hot_path_benchmarks.py --compare baseline.json
+
+Run from the repository root with the package directory and tests/benchmarks on PYTHONPATH. Baselines are only
+meaningful on the machine that produced them."""
+
+import argparse
+import json
+import logging
+import sys
+import timeit
+import tracemalloc
+import abstraction
+import hashing
+import ui_analysis
+from hierarchies import create_list_hierarchy
+
+NODE_COUNTS = [10, 100, 1000, 10000]
+QUICK_NODE_COUNTS = [10, 100, 1000]
+SHAPES = ["list", "text-fields", "scrollables"]
+REPEAT = 3
+TEST_CASE_LENGTH = 50
+DEFAULT_TOLERANCE = 0.2
+
+
+def create_hierarchy(shape, node_count):
+    if shape == "text-fields":
+        return create_list_hierarchy(node_count, text_fields=max(1, node_count // 4))
+    if shape == "scrollables":
+        return create_list_hierarchy(node_count, scrollables=max(1, node_count // 4))
+    return create_list_hierarchy(node_count)
+
+
+def create_cases(page_source):
+    state = abstraction.create_state("MainActivity", "state")
+    possible_actions = ui_analysis.get_possible_actions(page_source)
+    events = ui_analysis.get_snapshot_events(abstraction.create_snapshot(page_source, possible_actions, state))
+    event = events[0]
+    test_case = events[:TEST_CASE_LENGTH]
+
+    def create_partial_text_events():
+        text_entry_actions, non_text_entry_actions = ui_analysis.classify_actions(possible_actions)
+        return abstraction.create_partial_text_events(state, text_entry_actions, non_text_entry_actions)
+
+    return [
+        ("get_possible_actions", lambda: ui_analysis.get_possible_actions(page_source)),
+        ("_get_actionable_widgets", lambda: ui_analysis._get_actionable_widgets(page_source)),
+        ("create_partial_text_events", create_partial_text_events),
+        ("generate_state_hash", lambda: hashing.generate_state_hash(possible_actions)),
+        ("generate_event_hash", lambda: hashing.generate_event_hash(event)),
+        ("generate_test_case_hash", lambda: hashing.generate_test_case_hash(test_case))
+    ]
+
+
+def measure(function):
+    timer = timeit.Timer(function)
+    number, _ = timer.autorange()
+    best_time = min(timer.repeat(repeat=REPEAT, number=number)) / number
+
+    tracemalloc.start()
+    try:
+        function()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {"opsPerSec": 1 / best_time, "peakMemoryKb": peak_memory / 1024}
+
+
+def run(node_counts):
+    results = {}
+    print("{:<28} {:<12} {:>7} {:>14} {:>14}".format("function", "shape", "nodes", "ops/sec", "peak mem (KB)"))
+    for shape in SHAPES:
+        for node_count in node_counts:
+            page_source = create_hierarchy(shape, node_count)
+            for name, function in create_cases(page_source):
+                result = measure(function)
+                results["{}[{}-{}]".format(name, shape, node_count)] = result
+                print("{:<28} {:<12} {:>7} {:>14.1f} {:>14.1f}".format(name, shape, node_count, result["opsPerSec"],
+                                                                       result["peakMemoryKb"]))
+
+    return results
+
+
+def compare(results, baseline, tolerance):
+    regressions = []
+    for key, result in sorted(results.items()):
+        baseline_result = baseline.get(key)
+        if baseline_result is None:
+            continue
+
+        if result["opsPerSec"] < baseline_result["opsPerSec"] * (1 - tolerance):
+            regressions.append("{}: {:.1f} ops/sec, baseline {:.1f}".format(key, result["opsPerSec"],
+                                                                           baseline_result["opsPerSec"]))
+        if result["peakMemoryKb"] > baseline_result["peakMemoryKb"] * (1 + tolerance):
+            regressions.append("{}: {:.1f} KB peak, baseline {:.1f}".format(key, result["peakMemoryKb"],
+                                                                           baseline_result["peakMemoryKb"]))
+
+    return regressions
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--save", help="write the results to this JSON baseline")
+    parser.add_argument("--compare", help="compare the results against this JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE,
+                        help="allowed relative slowdown or memory growth before reporting a regression")
+    parser.add_argument("--quick", action="store_true", help="skip the 10,000 node hierarchies")
+    parser.add_argument("--with-logging", action="store_true", help="keep the debug logging enabled while timing")
+    options = parser.parse_args(args)
+
+    if not options.with_logging:
+        logging.disable(logging.INFO)
+
+    results = run(QUICK_NODE_COUNTS if options.quick else NODE_COUNTS)
+
+    if options.save:
+        with open(options.save, "w") as baseline_file:
+            json.dump(results, baseline_file, indent=2, sort_keys=True)
+
+    if options.compare:
+        with open(options.compare) as baseline_file:
+            regressions = compare(results, json.load(baseline_file), options.tolerance)
+        for regression in regressions:
+            print("REGRESSION " + regression)
+        if regressions:
+            return 1
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
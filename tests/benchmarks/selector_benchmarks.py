@@ -0,0 +1,33 @@
+"""Compares selector resolution with and without the resource-id index. Run from the repository root with the
+package directory and tests/benchmarks on PYTHONPATH."""
+
+import timeit
+import lxml.etree as etree
+import abstraction
+import ui_analysis
+from hierarchies import create_list_hierarchy
+
+NODE_COUNTS = [250, 500, 1000, 2000, 4000]
+
+
+def _resolve_selectors(page_source, use_index):
+    xml_tree = etree.ElementTree(etree.fromstring(page_source.encode()))
+    resource_id_index = abstraction.create_resource_id_index(xml_tree) if use_index else None
+    for element in xml_tree.iter():
+        abstraction._get_widget_selector(xml_tree, element, resource_id_index)
+
+
+def run():
+    print("{:>8} {:>14} {:>14} {:>14}".format("nodes", "search (ms)", "index (ms)", "analysis (ms)"))
+    for node_count in NODE_COUNTS:
+        page_source = create_list_hierarchy(node_count)
+        search_time = timeit.timeit(lambda: _resolve_selectors(page_source, False), number=1)
+        index_time = min(timeit.repeat(lambda: _resolve_selectors(page_source, True), number=1, repeat=5))
+        analysis_time = min(timeit.repeat(lambda: ui_analysis._get_actionable_widgets(page_source), number=1,
+                                          repeat=5))
+        print("{:>8} {:>14.2f} {:>14.2f} {:>14.2f}".format(node_count, search_time * 1000, index_time * 1000,
+                                                           analysis_time * 1000))
+
+
+if __name__ == "__main__":
+    run()
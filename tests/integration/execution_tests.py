@@ -145,8 +145,7 @@ class ExecutionTests(unittest.TestCase):
         precondition = abstraction.create_state("contactsActivity", "abcdef")
         text_field_target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/title", "", "EditText",
                                                       TargetState.ENABLED)
-        text_entry_action = abstraction.create_action(GUIActionType.TEXT_ENTRY, text_field_target)
-        text_entry_action.value = "[random string]"
+        text_entry_action = abstraction.create_action(GUIActionType.TEXT_ENTRY, text_field_target, "[random string]")
 
         enter_key_action = abstraction.create_action(GUIActionType.ENTER_KEY, abstraction.create_enter_target())
         text_entry_event = {
@@ -156,10 +155,10 @@ class ExecutionTests(unittest.TestCase):
         self.navigate_to_note_creation()
 
         # Act
-        self.executor.execute(text_entry_event)
+        executed_event = self.executor.execute(text_entry_event)
 
         # Assert
-        self.assertNotEqual(text_entry_action.value, "[random string]")
+        self.assertNotEqual(executed_event["actions"][0].value, "[random string]")
 
     def test_can_type_text_in_multiple_text_fields_and_click_button(self):
         # Arrange
@@ -171,11 +170,9 @@ class ExecutionTests(unittest.TestCase):
         non_text_target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/edit_note_save", "Save",
                                                     "TextView", TargetState.ENABLED)
 
-        text_entry_action_1 = abstraction.create_action(GUIActionType.TEXT_ENTRY, text_field_target_1)
-        text_entry_action_1.value = "[random string]"
+        text_entry_action_1 = abstraction.create_action(GUIActionType.TEXT_ENTRY, text_field_target_1, "[random string]")
 
-        text_entry_action_2 = abstraction.create_action(GUIActionType.TEXT_ENTRY, text_field_target_2)
-        text_entry_action_2.value = "[random string]"
+        text_entry_action_2 = abstraction.create_action(GUIActionType.TEXT_ENTRY, text_field_target_2, "[random string]")
 
         non_text_action = abstraction.create_action(GUIActionType.CLICK, non_text_target)
 
@@ -186,11 +183,11 @@ class ExecutionTests(unittest.TestCase):
         self.navigate_to_note_creation()
 
         # Act
-        self.executor.execute(multiple_text_entry_event)
+        executed_event = self.executor.execute(multiple_text_entry_event)
 
         # Assert
-        self.assertNotEqual(text_entry_action_1.value, "[random string]")
-        self.assertNotEqual(text_entry_action_2.value, "[random string]")
+        self.assertNotEqual(executed_event["actions"][0].value, "[random string]")
+        self.assertNotEqual(executed_event["actions"][1].value, "[random string]")
 
     def navigate_to_note_creation(self):
         self.driver.find_element_by_id("android:id/button3").click()
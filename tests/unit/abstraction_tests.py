@@ -1,7 +1,10 @@
 import abstraction
 import unittest
 import lxml.etree as etree
+import json
+import pickle
 import actions
+import hashing
 from constants import *
 
 
@@ -19,7 +22,7 @@ class AbstractionTests(unittest.TestCase):
         action_type = GUIActionType.LAUNCH
         action = actions.LaunchApp(action_target, action_type, None)
         expected_event = {
-            "actions": [action],
+            "actions": (action,),
             "precondition": {
                 "activityName": None,
                 "stateId": None
@@ -58,6 +61,32 @@ class AbstractionTests(unittest.TestCase):
         actual_widget = abstraction.create_ui_widget(element_tree, target_element)
         self.assertEqual(expected_widget, actual_widget)
 
+    def test_ui_widget_carries_bounds(self):
+        document_xml = """<?xml version="1.0" encoding="UTF-8"?>
+                        <hierarchy rotation="0"><android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="false" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
+                        </hierarchy>"""
+        element = etree.fromstring(document_xml.encode())
+        element_tree = etree.ElementTree(element)
+        widget = abstraction.create_ui_widget(element_tree, element_tree.find("android.widget.TextView"))
+        self.assertEqual(widget.bounds, (32, 146, 736, 210))
+        self.assertEqual(abstraction.create_action(GUIActionType.CLICK, widget).get_bounds_center(), (384, 178))
+
+    def test_create_target_returns_target_with_and_without_bounds(self):
+        # Act
+        target = abstraction.create_target(SelectorType.ID, "android:id/title", "Display Preferences",
+                                           TargetType.TEXT_VIEW, TargetState.ENABLED)
+        bounded_target = abstraction.create_target(SelectorType.ID, "android:id/title", "Display Preferences",
+                                                   TargetType.TEXT_VIEW, TargetState.ENABLED, (32, 146, 736, 210))
+
+        # Assert
+        self.assertIs(type(target), type(bounded_target))
+        self.assertIsNone(target.bounds)
+        self.assertEqual(target, bounded_target)
+
+    def test_get_widget_bounds_when_missing(self):
+        element = etree.fromstring("""<android.widget.TextView class="android.widget.TextView"/>""")
+        self.assertIsNone(abstraction.get_widget_bounds(element))
+
     def test_get_widget_state_disabled(self):
         element_xml = """<android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="false" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title" instance="1"/>"""
         element = etree.fromstring(element_xml)
@@ -136,6 +165,27 @@ class AbstractionTests(unittest.TestCase):
         elements_with_same_id = abstraction._get_elements_with_id(resource_id, element_tree)
         self.assertEqual(len(elements_with_same_id), 1)
 
+    def test_create_resource_id_index(self):
+        document_xml = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="false" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title" instance="1"/>
+                        <nest><android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="false" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/></nest>
+                        <android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="false" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title" instance="1"/></hierarchy>"""
+        element = etree.fromstring(document_xml.encode())
+        element_tree = etree.ElementTree(element)
+        resource_id_index = abstraction.create_resource_id_index(element_tree)
+        self.assertEqual(resource_id_index, {"android:id/title": 2, "android:id/title1": 1})
+
+    def test_get_widget_selector_with_resource_id_index(self):
+        document_xml = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="false" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title" instance="1"/>
+                        <nest><android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="false" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/></nest>
+                        <android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="false" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title" instance="1"/></hierarchy>"""
+        element = etree.fromstring(document_xml.encode())
+        element_tree = etree.ElementTree(element)
+        resource_id_index = abstraction.create_resource_id_index(element_tree)
+        for element_to_select in element_tree.getroot().iterdescendants("*"):
+            indexed_selector = abstraction._get_widget_selector(element_tree, element_to_select, resource_id_index)
+            searched_selector = abstraction._get_widget_selector(element_tree, element_to_select)
+            self.assertEqual(indexed_selector, searched_selector)
+
     def test_synthesize(self):
         action_target = {
             "selector": "id",
@@ -147,7 +197,7 @@ class AbstractionTests(unittest.TestCase):
         action_type = GUIActionType.CLICK
         action = actions.Click(action_target, action_type, None)
         partial_event = {
-            "actions": [action],
+            "actions": (action,),
             "precondition": {
                 "activityName": "launchActivity",
                 "stateId": "abcdef"
@@ -158,7 +208,7 @@ class AbstractionTests(unittest.TestCase):
             "stateId": "fedcba"
         }
         expected_complete_event = {
-            "actions": [action],
+            "actions": (action,),
             "precondition": {
                 "activityName": "launchActivity",
                 "stateId": "abcdef"
@@ -187,6 +237,17 @@ class AbstractionTests(unittest.TestCase):
         actual_state = abstraction.create_crash_state()
         self.assertEqual(actual_state, expected_state)
 
+    def test_create_snapshot(self):
+        state = abstraction.create_state("contactsActivity", "abcdef")
+        expected_snapshot = {
+            "pageSource": "<hierarchy/>",
+            "possibleActions": [],
+            "state": state,
+            "rotation": 0
+        }
+        actual_snapshot = abstraction.create_snapshot("<hierarchy/>", [], state, 0)
+        self.assertEqual(actual_snapshot, expected_snapshot)
+
     def test_create_target(self):
         expected_target = {
             "selector": "selector_type",
@@ -211,7 +272,7 @@ class AbstractionTests(unittest.TestCase):
         action = actions.Back(action_target, action_type, None)
         expected_event = {
             "precondition": precondition,
-            "actions": [action]
+            "actions": (action,)
         }
         actual_event = abstraction.create_back_event(precondition)
         self.maxDiff = None
@@ -230,11 +291,88 @@ class AbstractionTests(unittest.TestCase):
         action = actions.Home(action_target, action_type, None)
         expected_event = {
             "precondition": precondition,
-            "actions": [action]
+            "actions": (action,)
         }
         actual_event = abstraction.create_home_event(precondition)
         self.assertEqual(expected_event, actual_event)
 
+    def test_events_can_be_used_in_sets_and_as_keys(self):
+        # Arrange
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        back_event = abstraction.create_back_event(precondition)
+        same_back_event = abstraction.create_back_event(abstraction.create_state("contactsActivity", "abcdef"))
+        home_event = abstraction.create_home_event(precondition)
+
+        # Act
+        executed_events = {back_event, home_event}
+        event_counts = {back_event: 1}
+
+        # Assert
+        self.assertIn(same_back_event, executed_events)
+        self.assertEqual(event_counts[same_back_event], 1)
+        self.assertEqual(len({back_event, same_back_event, home_event}), 2)
+
+    def test_event_hash_does_not_change_when_synthesized(self):
+        # Arrange
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        back_event = abstraction.create_back_event(precondition)
+        partial_event_hash = hash(back_event)
+
+        # Act
+        complete_event = abstraction.synthesize(back_event, abstraction.create_state("launchActivity", "fedcba"))
+
+        # Assert
+        self.assertEqual(hash(back_event), partial_event_hash)
+        self.assertEqual(hash(complete_event), partial_event_hash)
+
+    def test_events_are_equal_only_when_their_dictionaries_are(self):
+        # Arrange
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        back_event = abstraction.create_back_event(precondition)
+        complete_event = abstraction.synthesize(back_event, abstraction.create_state("launchActivity", "fedcba"))
+        crash_event = abstraction.synthesize(back_event, abstraction.create_crash_state())
+
+        # Act
+        completed_events = {complete_event, crash_event}
+        completed_event_keys = {hashing.get_event_key(event) for event in completed_events}
+
+        # Assert
+        self.assertEqual(hash(complete_event), hash(crash_event))
+        self.assertNotEqual(complete_event, crash_event)
+        self.assertNotEqual(crash_event, dict(complete_event))
+        self.assertEqual(len(completed_events), 2)
+        self.assertNotIn(back_event, completed_events)
+        self.assertEqual(completed_event_keys, {hashing.get_event_key(back_event)})
+
+    def test_synthesize_shares_structure_without_mutating(self):
+        # Arrange
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        back_event = abstraction.create_back_event(precondition)
+
+        # Act
+        complete_event = abstraction.synthesize(back_event, abstraction.create_state("launchActivity", "fedcba"))
+
+        # Assert
+        self.assertNotIn("postcondition", back_event)
+        self.assertIs(complete_event["actions"], back_event["actions"])
+        self.assertIs(complete_event["precondition"], back_event["precondition"])
+
+    def test_events_are_immutable(self):
+        # Arrange
+        back_event = abstraction.create_back_event(abstraction.create_state("contactsActivity", "abcdef"))
+
+        # Act / Assert
+        with self.assertRaises(TypeError):
+            back_event["postcondition"] = abstraction.create_state("launchActivity", "fedcba")
+        with self.assertRaises(TypeError):
+            back_event.update(actions=[])
+        with self.assertRaises(AttributeError):
+            back_event["actions"].append(abstraction.create_home_event(back_event["precondition"])["actions"][0])
+        with self.assertRaises(TypeError):
+            back_event["precondition"]["stateId"] = "fedcba"
+        self.assertEqual(pickle.loads(pickle.dumps(back_event)), back_event)
+        self.assertEqual(pickle.loads(pickle.dumps(back_event["precondition"])), back_event["precondition"])
+
     def test_create_partial_event(self):
         # Arrange
         precondition = abstraction.create_state("contactsActivity", "abcdef")
@@ -255,7 +393,7 @@ class AbstractionTests(unittest.TestCase):
         # Assert
         expected_event = {
             "precondition": precondition,
-            "actions": gui_actions
+            "actions": tuple(gui_actions)
         }
         self.assertEqual(partial_event, expected_event)
 
@@ -313,7 +451,7 @@ class AbstractionTests(unittest.TestCase):
         enter_key_action = abstraction.create_action("enter", enter_target)
         expected_event = {
             "precondition": current_state,
-            "actions": [text_entry_action, enter_key_action]
+            "actions": (text_entry_action, enter_key_action)
         }
         # self.assertEqual(text_entry_enter_key_event["actions"][0]["value"], "[random string]")
         self.assertEqual(text_entry_enter_key_event, expected_event)
@@ -367,11 +505,11 @@ class AbstractionTests(unittest.TestCase):
         # Assert
         expected_event_1 = {
             "precondition": current_state,
-            "actions": [text_entry_action, action_1]
+            "actions": (text_entry_action, action_1)
         }
         expected_event_2 = {
             "precondition": current_state,
-            "actions": [text_entry_action, action_2]
+            "actions": (text_entry_action, action_2)
         }
         expected_events = [expected_event_1, expected_event_2]
         self.assertEqual(text_and_act_events, expected_events)
@@ -422,18 +560,19 @@ class AbstractionTests(unittest.TestCase):
                                                                               non_text_entry_actions)
 
         # Assert
-        text_entry_action.value = "[random string]"
+        self.assertIsNone(text_entry_action.value)
+        text_entry_action = text_entry_action.with_value("[random string]")
         expected_event_1 = {
             "precondition": current_state,
-            "actions": [text_entry_action, action_1]
+            "actions": (text_entry_action, action_1)
         }
         expected_event_2 = {
             "precondition": current_state,
-            "actions": [text_entry_action, action_2]
+            "actions": (text_entry_action, action_2)
         }
         expected_event_3 = {
             "precondition": current_state,
-            "actions": [text_entry_action, abstraction.create_action("enter", abstraction.create_enter_target())]
+            "actions": (text_entry_action, abstraction.create_action("enter", abstraction.create_enter_target()))
         }
         expected_events = [expected_event_1, expected_event_2, expected_event_3]
         self.assertEqual(expected_events, text_and_act_events)
@@ -496,15 +635,14 @@ class AbstractionTests(unittest.TestCase):
                                                                                  non_text_entry_actions)
 
         # Assert
-        text_entry_actions[0].value = "[random string]"
-        text_entry_actions[1].value = "[random string]"
+        text_entry_actions = [text_entry_action.with_value("[random string]") for text_entry_action in text_entry_actions]
         expected_event_1 = {
             "precondition": current_state,
-            "actions": text_entry_actions + [non_text_entry_action_1]
+            "actions": tuple(text_entry_actions) + (non_text_entry_action_1,)
         }
         expected_event_2 = {
             "precondition": current_state,
-            "actions": text_entry_actions + [non_text_entry_action_2]
+            "actions": tuple(text_entry_actions) + (non_text_entry_action_2,)
         }
         expected_events = [expected_event_1, expected_event_2]
         self.assertEqual(expected_events, text_and_act_events)
@@ -550,15 +688,15 @@ class AbstractionTests(unittest.TestCase):
         # Assert
         expected_event_1 = {
             "precondition": current_state,
-            "actions": [action_1]
+            "actions": (action_1,)
         }
         expected_event_2 = {
             "precondition": current_state,
-            "actions": [action_2]
+            "actions": (action_2,)
         }
         expected_event_3 = {
             "precondition": current_state,
-            "actions": [action_3]
+            "actions": (action_3,)
         }
         expected_events = [expected_event_1, expected_event_2, expected_event_3]
         self.assertEqual(expected_events, single_action_events)
@@ -610,32 +748,31 @@ class AbstractionTests(unittest.TestCase):
                                                                      non_text_entry_actions)
 
         # Assert - potentially improve tests to not assert on lists but use membership assert
-        text_entry_action = text_entry_actions[0]
-        text_entry_action.value = "[random string]"
+        text_entry_action = text_entry_actions[0].with_value("[random string]")
         enter_action = abstraction.create_action("enter", abstraction.create_enter_target())
         expected_event_1 = {
             "precondition": current_state,
-            "actions": [text_entry_action, non_text_entry_action_1]
+            "actions": (text_entry_action, non_text_entry_action_1)
         }
         expected_event_2 = {
             "precondition": current_state,
-            "actions": [text_entry_action, non_text_entry_action_2]
+            "actions": (text_entry_action, non_text_entry_action_2)
         }
         expected_event_3 = {
             "precondition": current_state,
-            "actions": [text_entry_action, enter_action]
+            "actions": (text_entry_action, enter_action)
         }
         expected_event_4 = {
             "precondition": current_state,
-            "actions": [non_text_entry_action_1]
+            "actions": (non_text_entry_action_1,)
         }
         expected_event_5 = {
             "precondition": current_state,
-            "actions": [non_text_entry_action_2]
+            "actions": (non_text_entry_action_2,)
         }
         expected_event_6 = {
             "precondition": current_state,
-            "actions": [non_text_entry_action_3]
+            "actions": (non_text_entry_action_3,)
         }
         expected_events = [expected_event_1, expected_event_2, expected_event_3, expected_event_4, expected_event_5,
                            expected_event_6]
@@ -697,25 +834,26 @@ class AbstractionTests(unittest.TestCase):
         events = abstraction.create_partial_text_events(current_state, text_entry_actions, non_text_entry_actions)
 
         # Assert
+        text_entry_actions = [text_entry_action.with_value("[random string]") for text_entry_action in text_entry_actions]
         expected_event_1 = {
             "precondition": current_state,
-            "actions": text_entry_actions + [non_text_entry_action_1]
+            "actions": tuple(text_entry_actions) + (non_text_entry_action_1,)
         }
         expected_event_2 = {
             "precondition": current_state,
-            "actions": text_entry_actions + [non_text_entry_action_2]
+            "actions": tuple(text_entry_actions) + (non_text_entry_action_2,)
         }
         expected_event_3 = {
             "precondition": current_state,
-            "actions": [non_text_entry_action_1]
+            "actions": (non_text_entry_action_1,)
         }
         expected_event_4 = {
             "precondition": current_state,
-            "actions": [non_text_entry_action_2]
+            "actions": (non_text_entry_action_2,)
         }
         expected_event_5 = {
             "precondition": current_state,
-            "actions": [non_text_entry_action_3]
+            "actions": (non_text_entry_action_3,)
         }
         expected_events = [expected_event_1, expected_event_2, expected_event_3, expected_event_4, expected_event_5]
         self.assertEqual(expected_events, events)
@@ -733,7 +871,7 @@ class AbstractionTests(unittest.TestCase):
             "stateId": "state_id_1"
         }
         event = {
-            "actions": [action_1],
+            "actions": (action_1,),
             "precondition": precondition,
             "postcondition": postcondition
         }
@@ -747,3 +885,18 @@ class AbstractionTests(unittest.TestCase):
         self.assertEqual(action_as_dict["target"], action_1.target)
         self.assertEqual(action_as_dict["type"], action_1.action_type)
         self.assertEqual(action_as_dict["value"], action_1.value)
+
+    def test_bounds_survive_serialization(self):
+        # Arrange
+        target = abstraction.create_target("id", "element_id", "description", "button", "enabled", (32, 146, 736, 210))
+        precondition = abstraction.create_state("activity_1", "state_id_1")
+        event = abstraction.create_partial_event(precondition, [actions.Click(target, GUIActionType.CLICK, None)])
+
+        # Act
+        serializable_event = json.loads(json.dumps(abstraction.make_event_serializable(event)))
+        executable_event = abstraction.make_event_executable(serializable_event)
+
+        # Assert
+        self.assertEqual(serializable_event["actions"][0]["target"]["bounds"], [32, 146, 736, 210])
+        self.assertEqual(executable_event["actions"][0].target.bounds, (32, 146, 736, 210))
+        self.assertEqual(executable_event, event)
@@ -0,0 +1,201 @@
+import actions
+import unittest
+import copy
+import json
+import tracemalloc
+from constants import *
+
+
+class ActionsTests(unittest.TestCase):
+
+    def test_hash_key_leaves_out_value_and_description(self):
+        # Arrange
+        target = {
+            "selector": "id",
+            "selectorValue": "txt_first_name",
+            "description": "First Name",
+            "type": "EditText",
+            "state": "enabled"
+        }
+        action = actions.TextEntry(target, GUIActionType.TEXT_ENTRY, "Hello")
+
+        # Act
+        hash_key = action.hash_key
+
+        # Assert
+        self.assertEqual(hash_key, (GUIActionType.TEXT_ENTRY, "id", "txt_first_name", "enabled", "EditText"))
+
+    def test_hash_key_is_cached(self):
+        # Arrange
+        target = {
+            "selector": "id",
+            "selectorValue": "ok_btn",
+            "description": "OK",
+            "type": "Button",
+            "state": "enabled"
+        }
+        action = actions.Click(target, GUIActionType.CLICK, None)
+
+        # Act
+        first_hash_key = action.hash_key
+        second_hash_key = action.hash_key
+
+        # Assert
+        self.assertIs(first_hash_key, second_hash_key)
+
+    def test_with_value_derives_action_sharing_target(self):
+        # Arrange
+        widget = {
+            "selector": "id",
+            "selectorValue": "txt_name",
+            "description": "Name",
+            "type": "EditText",
+            "state": "enabled"
+        }
+        action = actions.TextEntry(widget, GUIActionType.TEXT_ENTRY, None)
+        hash_key = action.hash_key
+
+        # Act
+        typed_action = action.with_value("Hello")
+
+        # Assert
+        self.assertIsNone(action.value)
+        self.assertEqual(typed_action.value, "Hello")
+        self.assertIsInstance(typed_action, actions.TextEntry)
+        self.assertIs(typed_action.target, action.target)
+        self.assertIs(typed_action.hash_key, hash_key)
+        self.assertIs(action.with_value(None), action)
+
+    def test_actions_are_immutable(self):
+        # Arrange
+        widget = {
+            "selector": "id",
+            "selectorValue": "ok_btn",
+            "description": "OK",
+            "type": "Button",
+            "state": "enabled"
+        }
+        action = actions.Click(widget, GUIActionType.CLICK, None)
+
+        # Act / Assert
+        with self.assertRaises(AttributeError):
+            action.value = "Hello"
+        with self.assertRaises(AttributeError):
+            action.target = widget
+        with self.assertRaises(AttributeError):
+            action.action_type = GUIActionType.LONG_CLICK
+
+    def test_identical_targets_are_interned(self):
+        # Arrange
+        first_widget = {
+            "selector": "id",
+            "selectorValue": "ok_btn",
+            "description": "OK",
+            "type": "Button",
+            "state": "enabled"
+        }
+        second_widget = dict(first_widget)
+
+        # Act
+        click = actions.Click(first_widget, GUIActionType.CLICK, None)
+        long_click = actions.LongClick(second_widget, GUIActionType.LONG_CLICK, None)
+
+        # Assert
+        self.assertIs(click.target, long_click.target)
+        self.assertIs(copy.deepcopy(click.target), click.target)
+        self.assertEqual(click.target, first_widget)
+        self.assertEqual(hash(click.target), hash(actions.intern_target(second_widget)))
+
+    def test_targets_are_immutable(self):
+        # Arrange
+        widget = {
+            "selector": "id",
+            "selectorValue": "ok_btn",
+            "description": "OK",
+            "type": "Button",
+            "state": "enabled"
+        }
+        action = actions.Click(widget, GUIActionType.CLICK, None)
+
+        # Act
+        widget["state"] = "disabled"
+
+        # Assert
+        self.assertEqual(action.target["state"], "enabled")
+        with self.assertRaises(TypeError):
+            action.target["state"] = "disabled"
+        with self.assertRaises(TypeError):
+            action.target.update(state="disabled")
+
+    def test_actions_with_targets_can_be_serialized(self):
+        # Arrange
+        widget = {
+            "selector": "id",
+            "selectorValue": "ok_btn",
+            "description": "OK",
+            "type": "Button",
+            "state": "enabled"
+        }
+        action = actions.Click(widget, GUIActionType.CLICK, None)
+
+        # Act
+        action_as_json = json.dumps(action.to_dict(), sort_keys=True)
+
+        # Assert
+        self.assertEqual(json.loads(action_as_json), {"target": widget, "type": GUIActionType.CLICK, "value": None})
+
+    def test_actions_have_no_instance_dict(self):
+        widget = {
+            "selector": "id",
+            "selectorValue": "ok_btn",
+            "description": "OK",
+            "type": "Button",
+            "state": "enabled"
+        }
+        action = actions.SwipeUp(widget, GUIActionType.SWIPE_UP, None)
+        self.assertFalse(hasattr(action, "__dict__"))
+
+    def test_retained_memory_per_action(self):
+        # Arrange
+        action_count = 2000
+        retained_actions = []
+        tracemalloc.start()
+        memory_before = tracemalloc.get_traced_memory()[0]
+
+        # Act
+        for i in range(action_count):
+            widget = {
+                "selector": "id",
+                "selectorValue": "org.example:id/row_action",
+                "description": "Open",
+                "type": "Button",
+                "state": "enabled"
+            }
+            retained_actions.append(actions.Click(widget, GUIActionType.CLICK, None))
+        memory_after = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+
+        # Assert
+        # an action holding its own five-key target dict retains roughly 300 bytes
+        self.assertLess((memory_after - memory_before) / action_count, 150)
+
+    def test_equal_actions_can_be_deduplicated_in_a_set(self):
+        # Arrange
+        widget = {
+            "selector": "id",
+            "selectorValue": "ok_btn",
+            "description": "OK",
+            "type": "Button",
+            "state": "enabled"
+        }
+        first_click = actions.Click(widget, GUIActionType.CLICK, None)
+        second_click = actions.Click(dict(widget), GUIActionType.CLICK, None)
+        long_click = actions.LongClick(widget, GUIActionType.LONG_CLICK, None)
+
+        # Act
+        unique_actions = {first_click, second_click, long_click}
+
+        # Assert
+        self.assertEqual(len(unique_actions), 2)
+        self.assertIn(actions.Click(widget, GUIActionType.CLICK, None), unique_actions)
+        self.assertEqual(hash(first_click), hash(second_click))
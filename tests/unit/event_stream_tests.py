@@ -0,0 +1,108 @@
+import unittest
+import os
+import tempfile
+import abstraction
+import event_stream
+from constants import *
+
+
+class EventStreamTests(unittest.TestCase):
+
+    def setUp(self):
+        self.stream_dir = tempfile.TemporaryDirectory()
+        self.stream_path = os.path.join(self.stream_dir.name, "events.jsonl")
+        self.precondition = abstraction.create_state("HomeActivity", "home")
+        self.postcondition = abstraction.create_state("ListActivity", "list")
+
+    def tearDown(self):
+        self.stream_dir.cleanup()
+
+    def create_click_event(self):
+        target = abstraction.create_target(SelectorType.ID, "org.example:id/open", "Open", TargetType.BUTTON,
+                                           TargetState.ENABLED)
+        event = abstraction.create_partial_event(self.precondition,
+                                                 [abstraction.create_action(GUIActionType.CLICK, target)])
+        return abstraction.synthesize(event, self.postcondition)
+
+    def test_written_events_are_not_mutated(self):
+        # Arrange
+        click_event = self.create_click_event()
+        click_action = click_event["actions"][0]
+
+        # Act
+        with event_stream.open_event_writer(self.stream_path) as event_writer:
+            event_writer.write_event(click_event)
+
+        # Assert
+        self.assertIs(click_event["actions"][0], click_action)
+
+    def test_events_and_test_cases_are_read_back(self):
+        # Arrange
+        click_event = self.create_click_event()
+        back_event = abstraction.synthesize(abstraction.create_back_event(self.postcondition), self.precondition)
+        with event_stream.open_event_writer(self.stream_path) as event_writer:
+            event_writer.write_event(click_event)
+            event_writer.write_test_case([click_event, back_event])
+
+        # Act
+        events = list(event_stream.read_events(self.stream_path))
+        test_cases = list(event_stream.read_test_cases(self.stream_path))
+
+        # Assert
+        self.assertEqual(events, [click_event])
+        self.assertEqual(type(events[0]["actions"][0]).__name__, "Click")
+        self.assertEqual(test_cases, [[click_event, back_event]])
+
+    def test_records_are_read_lazily(self):
+        # Arrange
+        with event_stream.open_event_writer(self.stream_path) as event_writer:
+            event_writer.write_event(self.create_click_event())
+            event_writer.write_event(self.create_click_event())
+
+        # Act
+        events = event_stream.read_events(self.stream_path, executable=False)
+        first_event = next(events)
+        events.close()
+
+        # Assert
+        self.assertEqual(first_event["actions"][0]["type"], GUIActionType.CLICK)
+
+    def test_incomplete_last_record_is_skipped(self):
+        # Arrange
+        with event_stream.open_event_writer(self.stream_path) as event_writer:
+            event_writer.write_event(self.create_click_event())
+        with open(self.stream_path, "a") as stream_file:
+            stream_file.write('{"event": {"precondition"')
+
+        # Act
+        events = list(event_stream.read_events(self.stream_path))
+
+        # Assert
+        self.assertEqual(len(events), 1)
+
+    def test_writer_resumes_after_crash(self):
+        # Arrange
+        with event_stream.open_event_writer(self.stream_path) as event_writer:
+            event_writer.write_event(self.create_click_event())
+        with open(self.stream_path, "a") as stream_file:
+            stream_file.write('{"event": {"precon')
+
+        # Act
+        with event_stream.open_event_writer(self.stream_path) as event_writer:
+            event_writer.write_event(self.create_click_event())
+            event_writer.write_event(self.create_click_event())
+
+        # Assert
+        self.assertEqual(len(list(event_stream.read_events(self.stream_path))), 3)
+
+    def test_writer_appends_to_existing_stream(self):
+        # Arrange
+        with event_stream.open_event_writer(self.stream_path) as event_writer:
+            event_writer.write_event(self.create_click_event())
+
+        # Act
+        with event_stream.open_event_writer(self.stream_path, sync=True) as event_writer:
+            event_writer.write_event(self.create_click_event())
+
+        # Assert
+        self.assertEqual(len(list(event_stream.read_events(self.stream_path))), 2)
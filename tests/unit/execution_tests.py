@@ -0,0 +1,398 @@
+import unittest
+import asyncio
+import time
+import abstraction
+import actions
+from constants import *
+from execution import Executor, AdaptiveWait, create_async_executor
+from unittest.mock import MagicMock
+from selenium.common.exceptions import InvalidArgumentException, StaleElementReferenceException, WebDriverException
+from selenium.webdriver.remote.command import Command
+
+
+class ExecutionTests(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = MagicMock(name="webdriver")
+        self.session_cache = actions.SessionCache()
+        self.executor = Executor(self.driver, 0, ["Hello", "World", "12345"], self.session_cache)
+
+    def create_click_event(self, state_id):
+        precondition = abstraction.create_state("contactsActivity", state_id)
+        target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/note_title", "Tomdroid's First Note",
+                                           TargetType.TEXT_VIEW, TargetState.ENABLED)
+        return abstraction.create_partial_event(precondition, [abstraction.create_action(GUIActionType.CLICK, target)])
+
+    def observe_state(self, executor, state_id="abcdef"):
+        executor.observe_snapshot(abstraction.create_snapshot("", [], abstraction.create_state("contactsActivity",
+                                                                                                state_id)))
+
+    def test_element_is_looked_up_once_per_state(self):
+        # Act
+        self.observe_state(self.executor)
+        self.executor.execute(self.create_click_event("abcdef"))
+        self.executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.assertEqual(self.driver.find_element_by_id.call_count, 1)
+        self.assertEqual(self.driver.find_element_by_id.return_value.click.call_count, 2)
+
+    def test_elements_are_evicted_when_the_observed_state_changes(self):
+        # Act
+        self.observe_state(self.executor, "abcdef")
+        self.executor.execute(self.create_click_event("abcdef"))
+        self.observe_state(self.executor, "fedcba")
+        self.executor.execute(self.create_click_event("fedcba"))
+        self.observe_state(self.executor, "abcdef")
+        self.executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.assertEqual(self.driver.find_element_by_id.call_count, 3)
+
+    def test_elements_are_keyed_by_the_observed_state(self):
+        # Arrange
+        self.observe_state(self.executor, "abcdef")
+        self.executor.execute(self.create_click_event("abcdef"))
+
+        # Act
+        self.observe_state(self.executor, "fedcba")
+        self.executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.assertEqual(self.driver.find_element_by_id.call_count, 2)
+
+    def test_elements_are_not_cached_before_a_state_is_observed(self):
+        # Act
+        self.executor.execute(self.create_click_event("abcdef"))
+        self.executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.assertEqual(self.driver.find_element_by_id.call_count, 2)
+
+    def test_stale_element_is_evicted_and_only_the_operation_is_repeated(self):
+        # Arrange
+        cached_element = MagicMock(name="cached_element")
+        fresh_element = MagicMock(name="fresh_element")
+        self.driver.find_element_by_id.side_effect = [cached_element, fresh_element]
+        self.observe_state(self.executor)
+        self.executor.execute(self.create_click_event("abcdef"))
+        cached_element.click.side_effect = StaleElementReferenceException("stale")
+
+        # Act
+        self.executor.execute(self.create_click_event("abcdef"))
+        self.executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.assertEqual(self.driver.find_element_by_id.call_count, 2)
+        self.assertEqual(cached_element.click.call_count, 2)
+        self.assertEqual(fresh_element.click.call_count, 2)
+
+    def test_elements_are_not_cached_without_a_session_cache(self):
+        # Arrange
+        executor = Executor(self.driver, 0, ["Hello"])
+
+        # Act
+        self.observe_state(executor)
+        executor.execute(self.create_click_event("abcdef"))
+        executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.assertEqual(self.driver.find_element_by_id.call_count, 2)
+
+    def test_click_is_tapped_at_bounds_center(self):
+        # Arrange
+        executor = Executor(self.driver, 0, ["Hello"], tap_by_coordinates=True)
+        self.observe_state(executor)
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/note_title", "Tomdroid's First Note",
+                                           TargetType.TEXT_VIEW, TargetState.ENABLED, (32, 146, 736, 210))
+        event = abstraction.create_partial_event(precondition, [abstraction.create_action(GUIActionType.CLICK, target)])
+
+        # Act
+        executor.execute(event)
+
+        # Assert
+        self.driver.tap.assert_called_once_with([(384, 178)])
+        self.driver.find_element_by_id.assert_not_called()
+
+    def test_click_falls_back_to_locator_when_tap_fails(self):
+        # Arrange
+        self.driver.tap.side_effect = WebDriverException("tap rejected")
+        executor = Executor(self.driver, 0, ["Hello"], tap_by_coordinates=True)
+        self.observe_state(executor)
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/note_title", "Tomdroid's First Note",
+                                           TargetType.TEXT_VIEW, TargetState.ENABLED, (32, 146, 736, 210))
+        event = abstraction.create_partial_event(precondition, [abstraction.create_action(GUIActionType.CLICK, target)])
+
+        # Act
+        executor.execute(event)
+
+        # Assert
+        self.driver.find_element_by_id.assert_called_once_with("org.tomdroid:id/note_title")
+        self.driver.find_element_by_id.return_value.click.assert_called_once_with()
+
+    def test_click_outside_the_window_is_located(self):
+        # Arrange
+        self.driver.get_window_size.return_value = {"width": 1280, "height": 720}
+        executor = Executor(self.driver, 0, ["Hello"], self.session_cache, tap_by_coordinates=True)
+        self.observe_state(executor)
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/note_title", "Tomdroid's First Note",
+                                           TargetType.TEXT_VIEW, TargetState.ENABLED, (32, 1146, 736, 1210))
+        event = abstraction.create_partial_event(precondition, [abstraction.create_action(GUIActionType.CLICK, target)])
+
+        # Act
+        executor.execute(event)
+
+        # Assert
+        self.driver.tap.assert_not_called()
+        self.driver.find_element_by_id.return_value.click.assert_called_once_with()
+
+    def test_click_with_stale_bounds_is_located(self):
+        # Arrange
+        executor = Executor(self.driver, 0, ["Hello"], tap_by_coordinates=True)
+        self.observe_state(executor, "fedcba")
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/note_title", "Tomdroid's First Note",
+                                           TargetType.TEXT_VIEW, TargetState.ENABLED, (32, 146, 736, 210))
+        event = abstraction.create_partial_event(precondition, [abstraction.create_action(GUIActionType.CLICK, target)])
+
+        # Act
+        executor.execute(event)
+
+        # Assert
+        self.driver.tap.assert_not_called()
+        self.driver.find_element_by_id.assert_called_once_with("org.tomdroid:id/note_title")
+        self.driver.find_element_by_id.return_value.click.assert_called_once_with()
+
+    def test_targets_without_bounds_are_located(self):
+        # Arrange
+        executor = Executor(self.driver, 0, ["Hello"], tap_by_coordinates=True)
+        self.observe_state(executor)
+
+        # Act
+        executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.driver.tap.assert_not_called()
+        self.driver.find_element_by_id.return_value.click.assert_called_once_with()
+
+    def create_swipe_event(self, action_type, bounds=None):
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/list", "", "ListView",
+                                           TargetState.ENABLED, bounds)
+        return abstraction.create_partial_event(precondition, [abstraction.create_action(action_type, target)])
+
+    def test_window_size_is_fetched_once_for_swipes(self):
+        # Arrange
+        self.driver.get_window_size.return_value = {"width": 720, "height": 1280}
+
+        # Act
+        self.executor.execute(self.create_swipe_event(GUIActionType.SWIPE_UP))
+        self.executor.execute(self.create_swipe_event(GUIActionType.SWIPE_LEFT))
+
+        # Assert
+        self.assertEqual(self.driver.get_window_size.call_count, 1)
+        self.driver.swipe.assert_any_call(360, 1024, 360, 256, 200)
+        self.driver.swipe.assert_any_call(576, 640, 144, 640, 200)
+
+    def test_window_size_is_fetched_again_after_rotation(self):
+        # Arrange
+        self.driver.get_window_size.side_effect = [{"width": 720, "height": 1280}, {"width": 1280, "height": 720}]
+        state = abstraction.create_state("contactsActivity", "abcdef")
+        self.executor.observe_snapshot(abstraction.create_snapshot("", [], state, 0))
+        self.executor.execute(self.create_swipe_event(GUIActionType.SWIPE_DOWN))
+
+        # Act
+        self.executor.observe_snapshot(abstraction.create_snapshot("", [], state, 0))
+        self.executor.execute(self.create_swipe_event(GUIActionType.SWIPE_DOWN))
+        self.executor.observe_snapshot(abstraction.create_snapshot("", [], state, 1))
+        self.executor.execute(self.create_swipe_event(GUIActionType.SWIPE_DOWN))
+
+        # Assert
+        self.assertEqual(self.driver.get_window_size.call_count, 2)
+        self.driver.swipe.assert_called_with(640, 144, 640, 576, 200)
+
+    def test_swipe_stays_inside_scrollable_bounds(self):
+        # Act
+        self.executor.execute(self.create_swipe_event(GUIActionType.SWIPE_RIGHT, (100, 200, 600, 400)))
+
+        # Assert
+        self.driver.get_window_size.assert_not_called()
+        self.driver.swipe.assert_called_once_with(200, 300, 500, 300, 200)
+
+    def test_adaptive_wait_returns_once_signal_is_stable(self):
+        # Arrange
+        idle_signal = MagicMock(side_effect=["loading", "loading", "ready", "ready", "ready"])
+        settle_wait = AdaptiveWait(idle_signal, poll_interval=0.01, stable_polls=2)
+        executor = Executor(self.driver, 5, ["Hello"], settle_wait=settle_wait)
+
+        # Act
+        executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.assertEqual(idle_signal.call_count, 5)
+        self.assertEqual(len(executor.settle_times), 1)
+        self.assertLess(executor.settle_times[0], 5)
+
+    def test_adaptive_wait_is_bounded_by_event_interval(self):
+        # Arrange
+        idle_signal = MagicMock(side_effect=range(1000))
+        settle_wait = AdaptiveWait(idle_signal, poll_interval=0.01, stable_polls=2)
+
+        # Act
+        settle_time = settle_wait.wait(self.driver, 0.05)
+
+        # Assert
+        self.assertGreaterEqual(settle_time, 0.05)
+        self.assertLess(settle_time, 1)
+
+    def test_fixed_wait_records_event_interval(self):
+        # Act
+        self.executor.execute(self.create_click_event("abcdef"))
+
+        # Assert
+        self.assertEqual(list(self.executor.settle_times), [0])
+
+    def create_form_event(self, bounds=(0, 100, 720, 200)):
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        name_target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/name", "", TargetType.EDIT_TEXT,
+                                                TargetState.ENABLED, bounds)
+        save_target = abstraction.create_target(SelectorType.ID, "org.tomdroid:id/save", "Save", TargetType.BUTTON,
+                                                TargetState.ENABLED, (0, 300, 720, 400))
+        return abstraction.create_partial_event(precondition, [
+            abstraction.create_action(GUIActionType.TEXT_ENTRY, name_target),
+            abstraction.create_action(GUIActionType.CLICK, save_target)
+        ])
+
+    def test_execute_returns_typed_event_without_mutating(self):
+        # Arrange
+        form_event = self.create_form_event()
+
+        # Act
+        executed_event = self.executor.execute(form_event)
+
+        # Assert
+        self.assertIsNone(form_event["actions"][0].value)
+        self.assertIn(executed_event["actions"][0].value, self.executor.text_values)
+        self.assertIs(executed_event["actions"][1], form_event["actions"][1])
+        self.assertEqual(hash(executed_event), hash(form_event))
+
+    def test_multi_action_event_is_sent_as_one_request(self):
+        # Arrange
+        self.driver.w3c = True
+        executor = Executor(self.driver, 0, ["Hi"], batch_actions=True)
+        self.observe_state(executor)
+
+        # Act
+        executor.execute(self.create_form_event())
+
+        # Assert
+        self.driver.execute.assert_called_once()
+        command, input_actions = self.driver.execute.call_args[0]
+        pointer_steps = input_actions["actions"][0]["actions"]
+        key_steps = input_actions["actions"][1]["actions"]
+        self.assertEqual(command, Command.W3C_ACTIONS)
+        self.assertEqual(len(pointer_steps), len(key_steps))
+        self.assertEqual(pointer_steps[0], {"type": "pointerMove", "duration": 0, "x": 360, "y": 150})
+        self.assertEqual(key_steps[3]["type"], "pause")
+        self.assertGreater(key_steps[3]["duration"], 0)
+        self.assertEqual([step["value"] for step in key_steps if step["type"] == "keyDown"],
+                         ["\ue009", "a", "\ue003", "H", "i"])
+        self.assertEqual(pointer_steps[-3]["y"], 350)
+        self.driver.find_element_by_id.assert_not_called()
+
+    def test_batch_falls_back_when_an_action_has_no_input_steps(self):
+        # Arrange
+        self.driver.w3c = True
+        executor = Executor(self.driver, 0, ["Hi"], batch_actions=True)
+        self.observe_state(executor)
+
+        # Act
+        executor.execute(self.create_form_event(bounds=None))
+
+        # Assert
+        self.driver.execute.assert_not_called()
+        self.driver.find_element_by_id.return_value.send_keys.assert_called_once_with("Hi")
+        self.driver.find_element_by_id.return_value.click.assert_called_once_with()
+
+    def test_rejected_batch_falls_back_to_single_actions(self):
+        # Arrange
+        self.driver.w3c = True
+        self.driver.execute.side_effect = InvalidArgumentException("invalid argument")
+        executor = Executor(self.driver, 0, ["Hi"], batch_actions=True)
+        self.observe_state(executor)
+
+        # Act
+        executor.execute(self.create_form_event())
+
+        # Assert
+        self.driver.find_element_by_id.return_value.send_keys.assert_called_once_with("Hi")
+        self.driver.find_element_by_id.return_value.click.assert_called_once_with()
+
+    def test_batch_failing_midway_is_not_repeated(self):
+        # Arrange
+        self.driver.w3c = True
+        self.driver.execute.side_effect = WebDriverException("session died")
+        executor = Executor(self.driver, 0, ["Hi"], batch_actions=True)
+        self.observe_state(executor)
+
+        # Act
+        with self.assertRaises(WebDriverException):
+            executor.execute(self.create_form_event())
+
+        # Assert
+        self.driver.find_element_by_id.assert_not_called()
+
+    def test_batch_falls_back_when_backend_is_not_w3c(self):
+        # Arrange
+        self.driver.w3c = False
+        executor = Executor(self.driver, 0, ["Hi"], batch_actions=True)
+        self.observe_state(executor)
+
+        # Act
+        executor.execute(self.create_form_event())
+
+        # Assert
+        self.driver.execute.assert_not_called()
+        self.assertEqual(self.driver.find_element_by_id.call_count, 2)
+
+    def test_async_executor_runs_sessions_concurrently(self):
+        # Arrange
+        executors = [create_async_executor(MagicMock(name="webdriver"), 0.2, ["Hi"]) for _ in range(5)]
+        loop = asyncio.new_event_loop()
+
+        async def execute_on_all_sessions():
+            await asyncio.gather(*[executor.execute(self.create_click_event("abcdef")) for executor in executors])
+
+        # Act
+        start_time = time.monotonic()
+        try:
+            loop.run_until_complete(execute_on_all_sessions())
+        finally:
+            loop.close()
+        elapsed_time = time.monotonic() - start_time
+
+        # Assert
+        self.assertLess(elapsed_time, 0.2 * len(executors))
+        for executor in executors:
+            executor.driver.find_element_by_id.return_value.click.assert_called_once_with()
+            self.assertEqual(list(executor.settle_times), [0.2])
+
+    def test_async_executor_with_adaptive_wait(self):
+        # Arrange
+        idle_signal = MagicMock(side_effect=["loading", "ready", "ready", "ready"])
+        settle_wait = AdaptiveWait(idle_signal, poll_interval=0.01, stable_polls=2)
+        executor = create_async_executor(self.driver, 5, ["Hi"], settle_wait=settle_wait)
+        loop = asyncio.new_event_loop()
+
+        # Act
+        try:
+            loop.run_until_complete(executor.execute(self.create_click_event("abcdef")))
+        finally:
+            loop.close()
+
+        # Assert
+        self.assertEqual(idle_signal.call_count, 4)
+        self.assertLess(executor.settle_times[0], 5)
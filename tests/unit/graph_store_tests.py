@@ -0,0 +1,113 @@
+import unittest
+import os
+import tempfile
+import abstraction
+from constants import *
+from graph_store import create_graph_store
+from hashing import generate_event_hash
+
+
+class GraphStoreTests(unittest.TestCase):
+
+    def setUp(self):
+        self.graph_store = create_graph_store()
+        self.home_state = abstraction.create_state("HomeActivity", "home")
+        self.list_state = abstraction.create_state("ListActivity", "list")
+        self.detail_state = abstraction.create_state("DetailActivity", "detail")
+
+    def tearDown(self):
+        self.graph_store.close()
+
+    def create_click_event(self, precondition, resource_id):
+        target = abstraction.create_target(SelectorType.ID, resource_id, resource_id, TargetType.BUTTON,
+                                           TargetState.ENABLED)
+        return abstraction.create_partial_event(precondition, [abstraction.create_action(GUIActionType.CLICK, target)])
+
+    def test_outgoing_events_are_rehydrated(self):
+        # Arrange
+        click_event = self.create_click_event(self.home_state, "org.example:id/open")
+        back_event = abstraction.create_back_event(self.home_state)
+
+        # Act
+        self.graph_store.add_events([click_event, back_event])
+        outgoing_events = self.graph_store.get_outgoing_events("home")
+
+        # Assert
+        self.assertCountEqual(outgoing_events, [click_event, back_event])
+        self.assertTrue(all(callable(event["actions"][0].execute) for event in outgoing_events))
+        self.assertEqual(self.graph_store.get_event(generate_event_hash(click_event)), click_event)
+        self.assertEqual(self.graph_store.get_state("home"), self.home_state)
+
+    def test_storing_does_not_mutate_events(self):
+        # Arrange
+        click_event = self.create_click_event(self.home_state, "org.example:id/open")
+        click_action = click_event["actions"][0]
+
+        # Act
+        self.graph_store.add_transition(abstraction.synthesize(click_event, self.list_state), 0.5)
+
+        # Assert
+        self.assertIs(click_event["actions"][0], click_action)
+
+    def test_executed_events_are_no_longer_unexplored(self):
+        # Arrange
+        click_event = self.create_click_event(self.home_state, "org.example:id/open")
+        back_event = abstraction.create_back_event(self.home_state)
+        self.graph_store.add_events([click_event, back_event])
+
+        # Act
+        self.graph_store.add_transition(abstraction.synthesize(click_event, self.list_state))
+
+        # Assert
+        self.assertEqual(self.graph_store.get_unexplored_events("home"), [back_event])
+        self.assertEqual(len(self.graph_store.get_unexplored_events(limit=1)), 1)
+
+    def test_repeated_transitions_keep_mean_latency(self):
+        # Arrange
+        click_event = self.create_click_event(self.home_state, "org.example:id/open")
+
+        # Act
+        self.graph_store.add_transitions([(abstraction.synthesize(click_event, self.list_state), 0.2),
+                                          (abstraction.synthesize(click_event, self.list_state), 0.4),
+                                          (abstraction.synthesize(click_event, self.list_state), None)])
+
+        # Assert
+        transitions = self.graph_store.get_transitions("home")
+        self.assertEqual(len(transitions), 1)
+        event_hash, target_state_id, observation_count, mean_latency = transitions[0]
+        self.assertEqual(event_hash, generate_event_hash(click_event))
+        self.assertEqual((target_state_id, observation_count), ("list", 3))
+        self.assertAlmostEqual(mean_latency, 0.3)
+
+    def test_states_reaching_follows_transitions_backwards(self):
+        # Arrange
+        self.graph_store.add_transitions([
+            (abstraction.synthesize(self.create_click_event(self.home_state, "open"), self.list_state), None),
+            (abstraction.synthesize(self.create_click_event(self.list_state, "item"), self.detail_state), None),
+            (abstraction.synthesize(abstraction.create_back_event(self.detail_state), self.list_state), None),
+            (abstraction.synthesize(abstraction.create_launch_event(), self.home_state), None)
+        ])
+
+        # Act
+        predecessor_states = self.graph_store.get_predecessor_states("detail")
+        states_reaching = self.graph_store.get_states_reaching("detail")
+
+        # Assert
+        self.assertEqual(predecessor_states, ["list"])
+        self.assertEqual(states_reaching, ["home", "list"])
+        self.assertEqual(self.graph_store.get_counts(), {"states": 3, "events": 4, "transitions": 4})
+
+    def test_graph_persists_between_runs(self):
+        # Arrange
+        click_event = self.create_click_event(self.home_state, "org.example:id/open")
+        with tempfile.TemporaryDirectory() as database_dir:
+            database_path = os.path.join(database_dir, "graph.db")
+            with create_graph_store(database_path) as graph_store:
+                graph_store.add_transition(abstraction.synthesize(click_event, self.list_state))
+
+            # Act
+            with create_graph_store(database_path) as graph_store:
+                transitions = graph_store.get_transitions("home")
+
+        # Assert
+        self.assertEqual(len(transitions), 1)
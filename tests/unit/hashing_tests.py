@@ -2,7 +2,10 @@ import hashing
 import actions
 import unittest
 import random
+import json
+import hashlib
 from constants import *
+from exceptions import InvalidParameter
 
 
 class HashingTests(unittest.TestCase):
@@ -101,6 +104,78 @@ class HashingTests(unittest.TestCase):
 
         self.assertEqual(len(set(hashes)), 1)
 
+    def test_state_hash_is_compatible_with_json_hash_source(self):
+        widgets = [
+            {
+                "selector": "id",
+                "selectorValue": "android:id/title1",
+                "description": "",
+                "type": "EditText",
+                "state": "enabled"
+            },
+            {
+                "selector": "xpath",
+                "selectorValue": "/hierarchy/android.widget.TextView[@text=\"Caf\u00e9\"]",
+                "description": "Caf\u00e9",
+                "type": "TextView",
+                "state": "disabled"
+            }
+        ]
+        possible_actions = [
+            actions.TextEntry(widgets[0], GUIActionType.TEXT_ENTRY, None),
+            actions.Click(widgets[1], GUIActionType.CLICK, None),
+            actions.Click(widgets[1], GUIActionType.LONG_CLICK, None)
+        ]
+        hash_source = []
+        for action in possible_actions:
+            hash_source.append(hashing._get_hash_action(action, hashing._get_hash_target(action)))
+        hash_source.sort(key=lambda the_action: the_action["type"] + "@" + the_action["target"]["selector"] +
+                         "=" + the_action["target"]["selectorValue"])
+        expected_state_id = hashlib.sha1(json.dumps(hash_source, sort_keys=True).encode("utf-8")).hexdigest()
+
+        state_id = hashing.generate_state_hash(possible_actions, HashAlgorithm.SHA1)
+
+        self.assertEqual(state_id, expected_state_id)
+        self.assertEqual(hashing.generate_state_hash([]), hashlib.sha1(b"[]").hexdigest())
+
+    def test_blake2b_state_hash_ignores_order(self):
+        widgets = [
+            {
+                "selector": "id",
+                "selectorValue": "android:id/title1",
+                "description": "",
+                "type": "EditText",
+                "state": "enabled"
+            },
+            {
+                "selector": "id",
+                "selectorValue": "android:id/checkbox1",
+                "description": "Show All",
+                "type": "CheckBox",
+                "state": "enabled"
+            }
+        ]
+        possible_actions = [
+            actions.TextEntry(widgets[0], GUIActionType.TEXT_ENTRY, None),
+            actions.Click(widgets[1], GUIActionType.CHECK, None),
+            actions.Click(widgets[1], GUIActionType.LONG_CLICK, None)
+        ]
+
+        hashes = []
+        for i in range(10):
+            random.shuffle(possible_actions)
+            state_id = hashing.generate_state_hash(possible_actions, HashAlgorithm.BLAKE2B)
+            hashes.append(state_id)
+
+        self.assertEqual(len(set(hashes)), 1)
+        self.assertEqual(len(hashes[0]), 40)
+        self.assertNotEqual(hashes[0], hashing.generate_state_hash(possible_actions))
+        self.assertNotEqual(hashes[0], hashing.generate_state_hash(possible_actions[:2], HashAlgorithm.BLAKE2B))
+
+    def test_state_hash_with_unknown_algorithm(self):
+        with self.assertRaises(InvalidParameter):
+            hashing.generate_state_hash([], "md5")
+
     def test_get_hash_event(self):
         # Arrange
         target = {
@@ -147,6 +222,44 @@ class HashingTests(unittest.TestCase):
         # Assert
         self.assertEqual(event_hash, "1c7d92889def3c42168491899e45bfb9a70ef790")
 
+    def test_event_hash_is_compatible_with_json_hash_source(self):
+        # Arrange
+        target = {
+            "selector": "id",
+            "selectorValue": "txt_name",
+            "description": "Name",
+            "type": "EditText",
+            "state": "enabled"
+        }
+        back_target = {
+            "selector": "key_code",
+            "selectorValue": KeyCode.BACK,
+            "description": "back",
+            "type": TargetType.NAV,
+            "state": TargetState.ENABLED
+        }
+        event = {
+            "actions": [actions.TextEntry(target, GUIActionType.TEXT_ENTRY, "Hello"),
+                        actions.Back(back_target, GUIActionType.BACK_NAV, None)],
+            "precondition": {
+                "activityName": "launchActivity",
+                "stateId": None
+            }
+        }
+        hash_source = json.dumps(hashing._get_hash_event(event), sort_keys=True)
+        expected_event_hash = hashlib.sha1(hash_source.encode("utf-8")).hexdigest()
+        test_case_hash_source = json.dumps([hashing._get_hash_event(event), hashing._get_hash_event(event)],
+                                           sort_keys=True)
+        expected_test_case_hash = hashlib.sha1(test_case_hash_source.encode("utf-8")).hexdigest()
+
+        # Act
+        event_hash = hashing.generate_event_hash(event)
+        test_case_hash = hashing.generate_test_case_hash([event, event])
+
+        # Assert
+        self.assertEqual(event_hash, expected_event_hash)
+        self.assertEqual(test_case_hash, expected_test_case_hash)
+
     def test_event_hash_is_stable(self):
         # Arrange
         target = {
@@ -380,5 +493,104 @@ class HashingTests(unittest.TestCase):
         # Assert
         self.assertNotEqual(test_case_hash1, test_case_hash2)
 
+    def test_test_case_hash_builder_matches_test_case_hash(self):
+        # Arrange
+        events = []
+        for i in range(5):
+            target = {
+                "selector": "id",
+                "selectorValue": "android:id/button{}".format(i),
+                "description": "Button {}".format(i),
+                "type": "Button",
+                "state": "enabled"
+            }
+            events.append({
+                "actions": [actions.Click(target, GUIActionType.CLICK, None)],
+                "precondition": {
+                    "activityName": "launchActivity",
+                    "stateId": "state{}".format(i)
+                }
+            })
 
+        # Act
+        builder = hashing.create_test_case_hash_builder()
+        empty_test_case_hash = builder.hexdigest()
+        prefix_hashes = []
+        for event in events:
+            builder = builder.extend(event)
+            prefix_hashes.append(builder.hexdigest())
+
+        # Assert
+        self.assertEqual(empty_test_case_hash, hashing.generate_test_case_hash([]))
+        for length, prefix_hash in enumerate(prefix_hashes, start=1):
+            self.assertEqual(prefix_hash, hashing.generate_test_case_hash(events[:length]))
+        self.assertEqual(builder.length, 5)
 
+    def test_test_case_hash_builder_shares_prefixes(self):
+        # Arrange
+        targets = [
+            {
+                "selector": "id",
+                "selectorValue": "android:id/ok",
+                "description": "OK",
+                "type": "Button",
+                "state": "enabled"
+            },
+            {
+                "selector": "id",
+                "selectorValue": "android:id/cancel",
+                "description": "Cancel",
+                "type": "Button",
+                "state": "enabled"
+            }
+        ]
+        precondition = {
+            "activityName": "launchActivity",
+            "stateId": "abcdef"
+        }
+        ok_event = {"actions": [actions.Click(targets[0], GUIActionType.CLICK, None)], "precondition": precondition}
+        cancel_event = {"actions": [actions.Click(targets[1], GUIActionType.CLICK, None)],
+                        "precondition": precondition}
+        prefix = hashing.create_test_case_hash_builder().extend(ok_event)
+
+        # Act
+        ok_then_cancel = prefix.extend(cancel_event)
+        ok_then_ok = prefix.extend(ok_event)
+
+        # Assert
+        self.assertEqual(prefix.hexdigest(), hashing.generate_test_case_hash([ok_event]))
+        self.assertEqual(ok_then_cancel.hexdigest(), hashing.generate_test_case_hash([ok_event, cancel_event]))
+        self.assertEqual(ok_then_ok.hexdigest(), hashing.generate_test_case_hash([ok_event, ok_event]))
+
+    def test_event_key_agrees_with_event_hash(self):
+        # Arrange
+        enabled_target = {
+            "selector": "id",
+            "selectorValue": "android:id/display_preferences",
+            "description": "Display Preferences",
+            "type": "TextView",
+            "state": "enabled"
+        }
+        disabled_target = dict(enabled_target, state="disabled")
+        relabelled_target = dict(enabled_target, description="Preferences")
+        precondition = {
+            "activityName": "launchActivity",
+            "stateId": "abcdef"
+        }
+        events = [
+            {"actions": [actions.Click(enabled_target, GUIActionType.CLICK, None)], "precondition": precondition},
+            {"actions": [actions.Click(relabelled_target, GUIActionType.CLICK, "x")], "precondition": precondition},
+            {"actions": [actions.Click(disabled_target, GUIActionType.CLICK, None)], "precondition": precondition},
+            {"actions": [actions.Click(enabled_target, GUIActionType.CLICK, None)],
+             "precondition": dict(precondition, stateId="fedcba")}
+        ]
+
+        # Act
+        event_keys = [hashing.get_event_key(event) for event in events]
+        event_hashes = [hashing.generate_event_hash(event) for event in events]
+
+        # Assert
+        for first_index in range(len(events)):
+            for second_index in range(len(events)):
+                self.assertEqual(event_keys[first_index] == event_keys[second_index],
+                                 event_hashes[first_index] == event_hashes[second_index])
@@ -0,0 +1,78 @@
+import unittest
+import instrumentation
+import ui_analysis
+from constants import *
+from execution import Executor
+from unittest.mock import MagicMock
+
+
+class InstrumentationTests(unittest.TestCase):
+
+    def setUp(self):
+        self.driver = MagicMock(name="webdriver")
+        self.driver.page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.FrameLayout index="0" text="" class="android.widget.FrameLayout" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[0,0][768,1280]" resource-id="" instance="0"><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/></android.widget.FrameLayout>
+                        </hierarchy>"""
+        self.driver.current_activity = "contactsActivity"
+        self.executor = Executor(self.driver, 0, ["Hello"])
+        self.step_records = []
+
+    def tearDown(self):
+        instrumentation.set_sink(None)
+
+    def run_step(self):
+        snapshot = ui_analysis.get_ui_snapshot(self.driver)
+        events = ui_analysis.get_snapshot_events(snapshot)
+        self.executor.execute(events[0])
+
+    def test_disabled_instrumentation_records_nothing(self):
+        # Act
+        self.run_step()
+
+        # Assert
+        self.assertFalse(instrumentation.is_enabled())
+        self.assertIs(instrumentation.phase(Phase.PARSE), instrumentation.phase(Phase.HASHING))
+        self.assertEqual(self.step_records, [])
+
+    def test_step_record_has_phase_breakdown(self):
+        # Arrange
+        instrumentation.set_sink(self.step_records.append)
+
+        # Act
+        self.run_step()
+
+        # Assert
+        self.assertEqual(len(self.step_records), 1)
+        step_record = self.step_records[0]
+        self.assertEqual(set(step_record["phases"]),
+                         {Phase.PAGE_SOURCE, Phase.ACTIVITY, Phase.PARSE, Phase.SELECTORS, Phase.HASHING,
+                          Phase.EVENTS, Phase.ACTIONS, Phase.ELEMENT_LOOKUP, Phase.SETTLE})
+        self.assertEqual(step_record["nodeCount"], 3)
+        self.assertEqual(step_record["actionCount"], 1)
+
+    def test_each_executed_event_ends_a_step(self):
+        # Arrange
+        instrumentation.set_sink(self.step_records.append)
+
+        # Act
+        self.run_step()
+        self.run_step()
+
+        # Assert
+        self.assertEqual(len(self.step_records), 2)
+        self.assertEqual(self.step_records[1]["actionCount"], 1)
+
+    def test_aggregator_reports_percentiles(self):
+        # Arrange
+        aggregator = instrumentation.PhaseAggregator()
+        for duration in range(1, 101):
+            step_record = instrumentation.create_step_record()
+            step_record["phases"][Phase.PARSE] = duration / 1000
+            aggregator(step_record)
+
+        # Act
+        percentiles = aggregator.get_percentiles()
+
+        # Assert
+        self.assertEqual(aggregator.step_count, 100)
+        self.assertEqual(percentiles[Phase.PARSE], {"p50": 0.05, "p95": 0.095, "p99": 0.099})
+        self.assertIn("parse", aggregator.report())
@@ -0,0 +1,122 @@
+import unittest
+import abstraction
+import navigation
+import replay
+import ui_analysis
+from constants import *
+from execution import Executor
+from graph_store import create_graph_store
+from hashing import generate_event_hash
+
+_PAGE_SOURCE_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.Button index="0" text="{0}" class="android.widget.Button" package="org.example" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="true" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="org.example:id/{0}" instance="0"/></hierarchy>"""
+
+
+class NavigationTests(unittest.TestCase):
+
+    def setUp(self):
+        recording = replay.create_recording(
+            "home",
+            {
+                "home": ("HomeActivity", _PAGE_SOURCE_TEMPLATE.format("open")),
+                "list": ("ListActivity", _PAGE_SOURCE_TEMPLATE.format("item")),
+                "detail": ("DetailActivity", _PAGE_SOURCE_TEMPLATE.format("share"))
+            },
+            {
+                "home": {replay.get_click_key("org.example:id/open"): "list"},
+                "list": {replay.get_click_key("org.example:id/item"): "detail",
+                         replay.get_keycode_key(KeyCode.BACK): "home"},
+                "detail": {replay.get_keycode_key(KeyCode.BACK): "list"}
+            })
+        self.driver = replay.ReplayDriver(recording)
+        self.executor = Executor(self.driver, 0, ["Hello"])
+        self.graph_store = create_graph_store()
+        self.states = {}
+        self.click_events = {}
+        for state_name in ["home", "list", "detail"]:
+            self.driver.current_state = state_name
+            snapshot = ui_analysis.get_ui_snapshot(self.driver)
+            self.states[state_name] = snapshot["state"]
+            self.click_events[state_name] = ui_analysis.get_snapshot_events(snapshot)[0]
+        self.driver.reset()
+
+    def tearDown(self):
+        self.graph_store.close()
+
+    def record(self, event, target, latency):
+        self.graph_store.add_transition(abstraction.synthesize(event, self.states[target]), latency)
+
+    def test_find_path_prefers_faster_route(self):
+        # Arrange
+        back_event = abstraction.create_back_event(self.states["detail"])
+        shortcut_event = abstraction.create_home_event(self.states["home"])
+        self.record(self.click_events["home"], "list", 1.0)
+        self.record(self.click_events["list"], "detail", 1.0)
+        self.record(back_event, "list", 0.5)
+        self.record(shortcut_event, "detail", 5.0)
+
+        # Act
+        steps = navigation.find_path(self.graph_store, self.states["home"]["stateId"],
+                                     self.states["detail"]["stateId"])
+        unreachable_steps = navigation.find_path(self.graph_store, self.states["list"]["stateId"],
+                                                 self.states["home"]["stateId"])
+
+        # Assert
+        self.assertEqual(steps, [(generate_event_hash(self.click_events["home"]), self.states["list"]["stateId"]),
+                                 (generate_event_hash(self.click_events["list"]), self.states["detail"]["stateId"])])
+        self.assertIsNone(unreachable_steps)
+
+    def test_find_path_takes_fewer_hops_when_they_are_faster(self):
+        # Arrange
+        shortcut_event = abstraction.create_home_event(self.states["home"])
+        self.record(self.click_events["home"], "list", 1.0)
+        self.record(self.click_events["list"], "detail", 1.0)
+        self.record(shortcut_event, "detail", 1.5)
+
+        # Act
+        steps = navigation.find_path(self.graph_store, self.states["home"]["stateId"],
+                                     self.states["detail"]["stateId"])
+
+        # Assert
+        self.assertEqual(steps, [(generate_event_hash(shortcut_event), self.states["detail"]["stateId"])])
+
+    def test_navigates_to_target_state(self):
+        # Arrange
+        self.record(self.click_events["home"], "list", 1.0)
+        self.record(self.click_events["list"], "detail", 1.0)
+        navigator = navigation.create_navigator(self.graph_store, self.executor)
+
+        # Act
+        reached = navigator.navigate(self.states["detail"]["stateId"])
+
+        # Assert
+        self.assertTrue(reached)
+        self.assertEqual(self.driver.current_state, "detail")
+        self.assertEqual(navigator.executed_event_count, 2)
+
+    def test_replans_when_postcondition_diverges(self):
+        # Arrange
+        self.record(self.click_events["home"], "detail", 0.1)
+        self.record(self.click_events["home"], "list", 1.0)
+        self.record(self.click_events["list"], "detail", 1.0)
+        self.graph_store.connection.execute("UPDATE transitions SET observation_count = 10 WHERE target_state_id = ?",
+                                            (self.states["detail"]["stateId"],))
+        navigator = navigation.create_navigator(self.graph_store, self.executor)
+
+        # Act
+        reached = navigator.navigate(self.states["detail"]["stateId"])
+
+        # Assert
+        self.assertTrue(reached)
+        self.assertEqual(self.driver.current_state, "detail")
+        self.assertEqual(navigator.executed_event_count, 2)
+
+    def test_gives_up_without_path(self):
+        # Arrange
+        navigator = navigation.create_navigator(self.graph_store, self.executor)
+
+        # Act
+        reached = navigator.navigate(self.states["detail"]["stateId"])
+
+        # Assert
+        self.assertFalse(reached)
+        self.assertEqual(navigator.executed_event_count, 0)
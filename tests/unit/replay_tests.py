@@ -0,0 +1,123 @@
+import unittest
+import json
+import os
+import tempfile
+import time
+import replay
+import ui_analysis
+from constants import *
+from execution import Executor
+from selenium.common.exceptions import NoSuchElementException
+
+
+MAIN_PAGE_SOURCE = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.FrameLayout index="0" text="" class="android.widget.FrameLayout" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[0,0][768,1280]" resource-id="" instance="0"><android.widget.Button index="0" text="Settings" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="true" focused="false" scrollable="false" long-clickable="true" password="false" selected="false" bounds="[32,146][736,210]" resource-id="org.tomdroid:id/settings" instance="0"/></android.widget.FrameLayout></hierarchy>"""
+
+SETTINGS_PAGE_SOURCE = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.TextView index="0" text="Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="org.tomdroid:id/title" instance="0"/></hierarchy>"""
+
+
+class ReplayTests(unittest.TestCase):
+
+    def setUp(self):
+        self.recording = replay.create_recording(
+            "main",
+            {
+                "main": ("Tomdroid", MAIN_PAGE_SOURCE),
+                "settings": ("PreferencesActivity", SETTINGS_PAGE_SOURCE)
+            },
+            {
+                "main": {
+                    replay.get_click_key("org.tomdroid:id/settings"): "settings",
+                    replay.get_long_click_key("org.tomdroid:id/settings"): "settings"
+                },
+                "settings": {replay.get_keycode_key(KeyCode.BACK): "main"}
+            })
+        self.driver = replay.ReplayDriver(self.recording)
+
+    def get_event(self, action_type):
+        snapshot = ui_analysis.get_ui_snapshot(self.driver)
+        for event in ui_analysis.get_snapshot_events(snapshot):
+            if event["actions"][0].action_type == action_type:
+                return event
+
+    def test_executed_events_follow_recorded_transitions(self):
+        # Arrange
+        executor = Executor(self.driver, 0, ["Hello"])
+        click_event = self.get_event(GUIActionType.CLICK)
+
+        # Act
+        executor.execute(click_event)
+        settings_activity = self.driver.current_activity
+        executor.execute(self.get_event(GUIActionType.BACK_NAV))
+
+        # Assert
+        self.assertEqual(settings_activity, "PreferencesActivity")
+        self.assertEqual(self.driver.current_activity, "Tomdroid")
+
+    def test_taps_and_long_presses_resolve_to_elements(self):
+        # Arrange
+        executor = Executor(self.driver, 0, ["Hello"], tap_by_coordinates=True)
+        long_click_event = self.get_event(GUIActionType.LONG_CLICK)
+
+        # Act
+        executor.observe_snapshot(ui_analysis.get_ui_snapshot(self.driver))
+        executor.execute(self.get_event(GUIActionType.CLICK))
+        state_after_tap = self.driver.current_state
+        self.driver.reset()
+        executor.observe_snapshot(ui_analysis.get_ui_snapshot(self.driver))
+        executor.execute(long_click_event)
+
+        # Assert
+        self.assertEqual(state_after_tap, "settings")
+        self.assertEqual(self.driver.current_state, "settings")
+        self.assertEqual(self.driver.inputs[-1], replay.get_long_click_key("org.tomdroid:id/settings"))
+
+    def test_missing_id_with_quote_raises_no_such_element(self):
+        # Act / Assert
+        with self.assertRaises(NoSuchElementException):
+            self.driver.find_element_by_id("org.tomdroid:id/it's")
+        self.assertIsNotNone(self.driver.find_element_by_id("org.tomdroid:id/settings"))
+
+    def test_unrecorded_inputs_keep_state(self):
+        # Act
+        self.driver.swipe(384, 1000, 384, 200, 200)
+        self.driver.background_app(1)
+
+        # Assert
+        self.assertEqual(self.driver.current_state, "main")
+        self.assertEqual(self.driver.inputs, [replay.get_swipe_key("up"), replay.BACKGROUND_KEY])
+
+    def test_missing_element_raises(self):
+        # Act / Assert
+        with self.assertRaises(NoSuchElementException):
+            self.driver.find_element_by_id("org.tomdroid:id/title")
+
+    def test_latency_is_simulated(self):
+        # Arrange
+        self.driver.latency = 0.01
+
+        # Act
+        start_time = time.perf_counter()
+        self.driver.page_source
+        elapsed_time = time.perf_counter() - start_time
+
+        # Assert
+        self.assertGreaterEqual(elapsed_time, 0.01)
+
+    def test_load_recording_reads_page_source_files(self):
+        # Arrange
+        with tempfile.TemporaryDirectory() as recording_dir:
+            with open(os.path.join(recording_dir, "main.xml"), "w", encoding="utf-8") as page_source_file:
+                page_source_file.write(MAIN_PAGE_SOURCE)
+            recording_path = os.path.join(recording_dir, "recording.json")
+            with open(recording_path, "w") as recording_file:
+                json.dump({
+                    "initialState": "main",
+                    "states": {"main": {"activity": "Tomdroid", "pageSourceFile": "main.xml"}},
+                    "transitions": {}
+                }, recording_file)
+
+            # Act
+            driver = replay.create_replay_driver(recording_path)
+
+        # Assert
+        self.assertEqual(driver.page_source, MAIN_PAGE_SOURCE)
@@ -0,0 +1,113 @@
+import unittest
+import functools
+import random
+import threading
+import time
+import abstraction
+import replay
+import scheduling
+from execution import Executor
+from unittest.mock import MagicMock
+
+
+class SchedulingTests(unittest.TestCase):
+
+    def create_driver(self):
+        driver = MagicMock(name="webdriver")
+        driver.page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
+                        </hierarchy>"""
+        driver.current_activity = "contactsActivity"
+        return driver
+
+    def test_episodes_run_on_all_devices_and_results_are_deduplicated(self):
+        # Arrange
+        executors = [Executor(self.create_driver(), 0, ["Hello"]) for _ in range(3)]
+        scheduler = scheduling.create_scheduler(executors)
+        jobs = [functools.partial(scheduling.explore_episode, episode_length=4, rng=random.Random(seed))
+                for seed in range(6)]
+
+        # Act
+        results = scheduler.run(jobs)
+
+        # Assert
+        self.assertEqual(len(results), 6)
+        self.assertTrue(all(len(completed_events) == 4 for completed_events in results))
+        self.assertEqual(len(scheduler.states), 1)
+        self.assertLessEqual(len(scheduler.events), 3)
+
+    def test_jobs_run_concurrently_on_free_devices(self):
+        # Arrange
+        executors = [Executor(self.create_driver(), 0, ["Hello"]) for _ in range(3)]
+        scheduler = scheduling.create_scheduler(executors)
+        all_devices_busy = threading.Barrier(3, timeout=5)
+        used_executors = []
+
+        def job(executor):
+            used_executors.append(executor)
+            all_devices_busy.wait()
+            return []
+
+        # Act
+        scheduler.run([job, job, job])
+
+        # Assert
+        self.assertEqual(len(set(map(id, used_executors))), 3)
+
+    def test_failed_job_is_recorded_and_other_results_are_returned(self):
+        # Arrange
+        executors = [Executor(self.create_driver(), 0, ["Hello"]) for _ in range(2)]
+        scheduler = scheduling.create_scheduler(executors)
+        error = RuntimeError("device disconnected")
+
+        def failing_job(executor):
+            raise error
+
+        jobs = [functools.partial(scheduling.explore_episode, episode_length=2, rng=random.Random(0)), failing_job,
+                functools.partial(scheduling.explore_episode, episode_length=3, rng=random.Random(1))]
+
+        # Act
+        results = scheduler.run(jobs)
+
+        # Assert
+        self.assertEqual(len(results[0]), 2)
+        self.assertIsNone(results[1])
+        self.assertEqual(len(results[2]), 3)
+        self.assertEqual(len(scheduler.failures), 1)
+        self.assertIn(scheduler.failures[0][0], executors)
+        self.assertIs(scheduler.failures[0][1], error)
+
+    def test_throughput_scales_with_device_count(self):
+        # Arrange
+        recording = replay.create_recording("main", {"main": ("contactsActivity", self.create_driver().page_source)},
+                                            {})
+        jobs = [functools.partial(scheduling.explore_episode, episode_length=2, rng=random.Random(seed))
+                for seed in range(8)]
+
+        def time_jobs(device_count):
+            executors = [Executor(replay.ReplayDriver(recording, latency=0.01), 0, ["Hello"])
+                         for _ in range(device_count)]
+            start_time = time.monotonic()
+            scheduling.create_scheduler(executors).run(jobs)
+            return time.monotonic() - start_time
+
+        # Act
+        one_device_time = time_jobs(1)
+        four_device_time = time_jobs(4)
+
+        # Assert
+        self.assertLess(four_device_time, one_device_time / 2)
+
+    def test_replay_test_case_synthesizes_events(self):
+        # Arrange
+        driver = self.create_driver()
+        executor = Executor(driver, 0, ["Hello"])
+        precondition = abstraction.create_state("contactsActivity", "abcdef")
+        test_case = [abstraction.create_back_event(precondition), abstraction.create_home_event(precondition)]
+
+        # Act
+        completed_events = scheduling.replay_test_case(executor, test_case)
+
+        # Assert
+        self.assertEqual(len(completed_events), 2)
+        self.assertEqual(completed_events[0]["postcondition"]["activityName"], "contactsActivity")
+        self.assertEqual(driver.press_keycode.call_count, 2)
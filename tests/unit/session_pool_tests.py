@@ -0,0 +1,148 @@
+import threading
+import unittest
+from exceptions import SessionPoolClosed
+from execution import Executor
+from session_pool import create_session_pool
+from selenium.common.exceptions import WebDriverException
+from unittest.mock import MagicMock
+
+
+class SessionPoolTests(unittest.TestCase):
+
+    def setUp(self):
+        self.create_session = MagicMock(side_effect=lambda: MagicMock(name="webdriver"))
+
+    def test_sessions_are_reused_between_leases(self):
+        # Arrange
+        session_pool = create_session_pool(self.create_session, 2)
+
+        # Act
+        with session_pool.lease() as first_driver:
+            pass
+        with session_pool.lease() as second_driver:
+            pass
+
+        # Assert
+        self.assertIs(first_driver, second_driver)
+        self.assertEqual(self.create_session.call_count, 1)
+        self.assertEqual(second_driver.launch_app.call_count, 2)
+
+    def test_pool_does_not_exceed_size(self):
+        # Arrange
+        session_pool = create_session_pool(self.create_session, 2)
+
+        # Act
+        with session_pool.lease() as first_driver, session_pool.lease() as second_driver:
+            pass
+        with session_pool.lease():
+            pass
+
+        # Assert
+        self.assertIsNot(first_driver, second_driver)
+        self.assertEqual(self.create_session.call_count, 2)
+
+    def test_reset_can_clear_app_data(self):
+        # Arrange
+        session_pool = create_session_pool(self.create_session, 1, "org.tomdroid", ".ui.Tomdroid", clear_data=True)
+
+        # Act
+        with session_pool.lease() as driver:
+            pass
+
+        # Assert
+        driver.execute_script.assert_called_once_with("mobile: shell",
+                                                      {"command": "pm", "args": ["clear", "org.tomdroid"]})
+        driver.start_activity.assert_called_once_with("org.tomdroid", ".ui.Tomdroid")
+        driver.close_app.assert_not_called()
+
+    def test_broken_session_is_replaced(self):
+        # Arrange
+        session_pool = create_session_pool(self.create_session, 1)
+
+        # Act
+        with self.assertRaises(WebDriverException):
+            with session_pool.lease() as broken_driver:
+                raise WebDriverException("session died")
+        with session_pool.lease() as driver:
+            pass
+
+        # Assert
+        broken_driver.quit.assert_called_once_with()
+        self.assertIsNot(driver, broken_driver)
+        self.assertEqual(session_pool.sessions, [driver])
+
+    def test_lease_executor_wraps_session(self):
+        # Arrange
+        session_pool = create_session_pool(self.create_session, 1)
+
+        # Act
+        with session_pool.lease_executor(0, ["Hello"]) as executor:
+            pass
+
+        # Assert
+        self.assertIsInstance(executor, Executor)
+        self.assertIs(executor.driver, session_pool.sessions[0])
+
+    def test_close_quits_all_sessions(self):
+        # Arrange
+        session_pool = create_session_pool(self.create_session, 1)
+        with session_pool.lease() as driver:
+            pass
+
+        # Act
+        session_pool.close()
+
+        # Assert
+        driver.quit.assert_called_once_with()
+        self.assertEqual(session_pool.sessions, [])
+
+    def test_failed_replacement_frees_its_slot(self):
+        # Arrange
+        session_pool = create_session_pool(self.create_session, 1)
+        with session_pool.lease() as broken_driver:
+            pass
+        broken_driver.launch_app.side_effect = WebDriverException("session died")
+        self.create_session.side_effect = [self._create_broken_driver(), MagicMock(name="webdriver")]
+
+        # Act
+        with self.assertRaises(WebDriverException):
+            with session_pool.lease():
+                pass
+        with session_pool.lease() as driver:
+            pass
+
+        # Assert
+        self.assertEqual(session_pool.sessions, [driver])
+        self.assertEqual(self.create_session.call_count, 3)
+
+    def test_close_wakes_waiting_leases(self):
+        # Arrange
+        session_pool = create_session_pool(self.create_session, 1)
+        errors = []
+
+        def lease():
+            try:
+                with session_pool.lease():
+                    pass
+            except SessionPoolClosed as e:
+                errors.append(e)
+
+        # Act
+        with session_pool.lease() as driver:
+            waiting_threads = [threading.Thread(target=lease) for _ in range(2)]
+            for thread in waiting_threads:
+                thread.start()
+            session_pool.close()
+        for thread in waiting_threads:
+            thread.join(5)
+
+        # Assert
+        self.assertFalse(any(thread.is_alive() for thread in waiting_threads))
+        self.assertEqual(len(errors), 2)
+        driver.quit.assert_called_once_with()
+
+    @staticmethod
+    def _create_broken_driver():
+        driver = MagicMock(name="webdriver")
+        driver.launch_app.side_effect = WebDriverException("session died")
+        return driver
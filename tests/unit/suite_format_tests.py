@@ -0,0 +1,97 @@
+import unittest
+import json
+import os
+import tempfile
+import abstraction
+import suite_format
+from constants import *
+from exceptions import InvalidSuiteFormat
+
+
+class SuiteFormatTests(unittest.TestCase):
+
+    def setUp(self):
+        self.suite_dir = tempfile.TemporaryDirectory()
+        self.suite_path = os.path.join(self.suite_dir.name, "suite.bin")
+
+    def tearDown(self):
+        self.suite_dir.cleanup()
+
+    def create_test_case(self, length):
+        test_case = [abstraction.synthesize(abstraction.create_launch_event(),
+                                            abstraction.create_state("HomeActivity", "state_0"))]
+        for index in range(1, length):
+            precondition = abstraction.create_state("HomeActivity", "state_{}".format(index - 1))
+            target = abstraction.create_target(SelectorType.ID, "org.example:id/field_{}".format(index % 3),
+                                               "Field", TargetType.EDIT_TEXT, TargetState.ENABLED)
+            text_entry_action = abstraction.create_action(GUIActionType.TEXT_ENTRY, target, "Hello")
+            event = abstraction.create_partial_event(precondition, [text_entry_action,
+                                                                    abstraction.create_action(
+                                                                        GUIActionType.ENTER_KEY,
+                                                                        abstraction.create_enter_target())])
+            test_case.append(abstraction.synthesize(event, abstraction.create_state("HomeActivity",
+                                                                                    "state_{}".format(index))))
+        return test_case
+
+    def get_json_shape(self, test_cases):
+        return [[abstraction.create_serializable_event(event) for event in test_case] for test_case in test_cases]
+
+    def test_round_trip_matches_json_shape(self):
+        # Arrange
+        test_cases = [self.create_test_case(3), self.create_test_case(5), [abstraction.create_back_event(
+            abstraction.create_state("HomeActivity", "state_0"))]]
+
+        # Act
+        suite_format.write_suite(test_cases, self.suite_path)
+        read_test_cases = suite_format.read_suite(self.suite_path)
+
+        # Assert
+        self.assertEqual(read_test_cases, json.loads(json.dumps(self.get_json_shape(test_cases))))
+
+    def test_executable_test_cases_are_rehydrated(self):
+        # Arrange
+        test_case = self.create_test_case(3)
+        suite_format.write_suite([test_case], self.suite_path)
+
+        # Act
+        with suite_format.open_suite(self.suite_path) as suite_reader:
+            executable_test_case = suite_reader.get_test_case(0, executable=True)
+
+        # Assert
+        self.assertEqual(executable_test_case, test_case)
+        self.assertEqual(executable_test_case[1]["actions"][0].value, "Hello")
+
+    def test_shared_structure_is_stored_once(self):
+        # Arrange
+        test_cases = [self.create_test_case(length) for length in range(1, 60)]
+        json_path = os.path.join(self.suite_dir.name, "suite.json")
+        with open(json_path, "w") as json_file:
+            json.dump(self.get_json_shape(test_cases), json_file)
+
+        # Act
+        suite_format.convert_json_to_suite(json_path, self.suite_path)
+
+        # Assert
+        self.assertLess(os.path.getsize(self.suite_path) * 10, os.path.getsize(json_path))
+
+    def test_convert_suite_to_json(self):
+        # Arrange
+        test_cases = [self.create_test_case(4)]
+        json_path = os.path.join(self.suite_dir.name, "suite.json")
+        suite_format.write_suite(test_cases, self.suite_path)
+
+        # Act
+        suite_format.convert_suite_to_json(self.suite_path, json_path)
+
+        # Assert
+        with open(json_path) as json_file:
+            self.assertEqual(json.load(json_file), json.loads(json.dumps(self.get_json_shape(test_cases))))
+
+    def test_invalid_file_raises(self):
+        # Arrange
+        with open(self.suite_path, "wb") as suite_file:
+            suite_file.write(b"not a suite file at all, just some bytes")
+
+        # Act / Assert
+        with self.assertRaises(InvalidSuiteFormat):
+            suite_format.open_suite(self.suite_path)
@@ -1,9 +1,11 @@
 import unittest
+import asyncio
+import threading
 import ui_analysis
 import abstraction
 import actions
 from constants import *
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, PropertyMock, patch
 
 
 class UIAnalysisTests(unittest.TestCase):
@@ -46,13 +48,107 @@ class UIAnalysisTests(unittest.TestCase):
         expected_available_events = [
             {
                 "precondition": current_state,
-                "actions": [actions.Click(expected_target, GUIActionType.CLICK, None)]
+                "actions": (actions.Click(expected_target, GUIActionType.CLICK, None),)
             },
             abstraction.create_back_event(current_state),
             abstraction.create_background_event(current_state)
         ]
         self.assertEqual(available_events, expected_available_events)
     
+    def test_get_available_events_fetches_page_source_once(self):
+        # Arrange
+        webdriver_mock = MagicMock(name="webdriver")
+        page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
+                        </hierarchy>"""
+        page_source_mock = PropertyMock(return_value=page_source)
+        current_activity_mock = PropertyMock(return_value="contactsActivity")
+        type(webdriver_mock).page_source = page_source_mock
+        type(webdriver_mock).current_activity = current_activity_mock
+
+        # Act
+        available_events = ui_analysis.get_available_events(webdriver_mock)
+
+        # Assert
+        self.assertEqual(page_source_mock.call_count, 1)
+        self.assertEqual(current_activity_mock.call_count, 1)
+        self.assertEqual(len(available_events), 3)
+
+    def test_get_ui_snapshot(self):
+        # Arrange
+        webdriver_mock = MagicMock(name="webdriver")
+        webdriver_mock.page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
+                        </hierarchy>"""
+        webdriver_mock.current_activity = "contactsActivity"
+
+        # Act
+        snapshot = ui_analysis.get_ui_snapshot(webdriver_mock)
+
+        # Assert
+        expected_target = abstraction.create_target("id", "android:id/title1", "Display Preferences", TargetType.BUTTON, TargetState.ENABLED)
+        self.assertEqual(snapshot["pageSource"], webdriver_mock.page_source)
+        self.assertEqual(snapshot["rotation"], 0)
+        self.assertEqual(snapshot["possibleActions"], [actions.Click(expected_target, GUIActionType.CLICK, None)])
+        self.assertEqual(snapshot["state"], ui_analysis.get_current_state(webdriver_mock))
+        self.assertEqual(ui_analysis.get_snapshot_events(snapshot), ui_analysis.get_available_events(webdriver_mock))
+
+    def test_get_ui_snapshot_when_page_source_is_unavailable(self):
+        # Arrange
+        webdriver_mock = MagicMock(name="webdriver")
+        type(webdriver_mock).page_source = PropertyMock(side_effect=Exception("session lost"))
+
+        # Act
+        snapshot = ui_analysis.get_ui_snapshot(webdriver_mock)
+
+        # Assert
+        self.assertEqual(snapshot["state"], abstraction.create_crash_state())
+        self.assertEqual(snapshot["possibleActions"], [])
+
+    def test_get_ui_snapshot_async_fetches_source_and_activity_concurrently(self):
+        # Arrange
+        page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
+                        </hierarchy>"""
+        both_requests_in_flight = threading.Barrier(2, timeout=5)
+
+        def fetch(value):
+            both_requests_in_flight.wait()
+            return value
+
+        webdriver_mock = MagicMock(name="webdriver")
+        type(webdriver_mock).page_source = PropertyMock(side_effect=lambda: fetch(page_source))
+        type(webdriver_mock).current_activity = PropertyMock(side_effect=lambda: fetch("contactsActivity"))
+        loop = asyncio.new_event_loop()
+
+        # Act
+        try:
+            snapshot = loop.run_until_complete(ui_analysis.get_ui_snapshot_async(webdriver_mock))
+            available_events = loop.run_until_complete(ui_analysis.get_available_events_async(webdriver_mock))
+        finally:
+            loop.close()
+
+        # Assert
+        self.assertEqual(snapshot["state"]["activityName"], "contactsActivity")
+        self.assertEqual(len(snapshot["possibleActions"]), 1)
+        self.assertEqual(available_events, ui_analysis.get_snapshot_events(snapshot))
+
+    def test_get_ui_snapshot_async_when_page_source_is_unavailable(self):
+        # Arrange
+        webdriver_mock = MagicMock(name="webdriver")
+        type(webdriver_mock).page_source = PropertyMock(side_effect=Exception("session lost"))
+        loop = asyncio.new_event_loop()
+
+        # Act
+        try:
+            snapshot = loop.run_until_complete(ui_analysis.get_ui_snapshot_async(webdriver_mock))
+        finally:
+            loop.close()
+
+        # Assert
+        self.assertEqual(snapshot["state"], abstraction.create_crash_state())
+
+    def test_get_rotation(self):
+        self.assertEqual(ui_analysis.get_rotation('<?xml version="1.0"?><hierarchy index="0" rotation="1"></hierarchy>'), 1)
+        self.assertIsNone(ui_analysis.get_rotation('<?xml version="1.0"?><hierarchy></hierarchy>'))
+
     def test_can_identify_clickable_widgets(self):
         page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
                         <nest><android.widget.TextView index="0" text="Login" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title2" instance="1"/>
@@ -267,6 +363,48 @@ class UIAnalysisTests(unittest.TestCase):
         self.assertEqual(actual_actionable_widgets[GUIActionType.SWIPE_RIGHT], scrollable_widgets)
         self.assertEqual(actual_actionable_widgets[GUIActionType.SWIPE_LEFT], scrollable_widgets)
 
+    def test_widgets_are_only_built_for_actionable_elements(self):
+        page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="true" long-clickable="true" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
+                        <nest><android.widget.TextView index="0" text="Login" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title2" instance="1"/>
+                        </nest><android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title3" instance="1"/>
+                        </hierarchy>"""
+        stats = {}
+        with patch("abstraction.create_ui_widget", wraps=abstraction.create_ui_widget) as create_ui_widget:
+            actual_actionable_widgets = ui_analysis._get_actionable_widgets(page_source, stats)
+
+        self.assertEqual(create_ui_widget.call_count, 1)
+        self.assertEqual(stats, {"widgetsBuilt": 1, "widgetsSkipped": 4})
+        self.assertIs(actual_actionable_widgets[GUIActionType.CLICK][0],
+                      actual_actionable_widgets[GUIActionType.SWIPE_UP][0])
+
+    def test_streaming_analyzer_finds_same_widgets(self):
+        page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.EditText index="0" text="" class="android.widget.EditText" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
+                        <nest><android.widget.CheckBox index="0" text="" class="android.widget.CheckBox" package="org.tomdroid" content-desc="" checkable="true" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title2" instance="1"/>
+                        <android.widget.CheckBox index="0" text="" class="android.widget.CheckBox" package="org.tomdroid" content-desc="" checkable="true" checked="true" clickable="false" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title2" instance="1"/>
+                        </nest><nest><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="true" password="false" selected="false" bounds="[32,146][736,210]" resource-id="" instance="1"/>
+                        </nest><android.widget.TextView index="0" text="Display Preferences" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="false" enabled="true" focusable="false" focused="false" scrollable="true" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title5" instance="1"/>
+                        </hierarchy>"""
+        expected_stats = {}
+        expected_actions = ui_analysis.get_possible_actions(page_source, expected_stats)
+        actual_stats = {}
+        actual_actions = ui_analysis.get_possible_actions(page_source, actual_stats, streaming=True)
+        self.assertEqual(actual_actions, expected_actions)
+        self.assertEqual(actual_stats, expected_stats)
+
+    def test_streamed_xpath_matches_lxml_path(self):
+        # <hierarchy><a/><nest><b/></nest><nest><b/><b/><c/></nest></hierarchy>
+        expected_paths = ["/hierarchy/nest[2]/b[2]", "/hierarchy/nest[2]/c", "/hierarchy/a"]
+        root_path = ("hierarchy", None, None, None)
+        sibling_counts = {"a": 1, "nest": 2}
+        second_nest_path = ("nest", 2, root_path, sibling_counts)
+        nest_sibling_counts = {"b": 2, "c": 1}
+        actual_paths = [
+            ui_analysis._get_streamed_element_xpath(("b", 2, second_nest_path, nest_sibling_counts)),
+            ui_analysis._get_streamed_element_xpath(("c", 1, second_nest_path, nest_sibling_counts)),
+            ui_analysis._get_streamed_element_xpath(("a", 1, root_path, sibling_counts))
+        ]
+        self.assertEqual(actual_paths, expected_paths)
+
     def test_get_click_actions(self):
         page_source = """<?xml version="1.0" encoding="UTF-8"?><hierarchy rotation="0"><android.widget.Button index="0" text="Display Preferences" class="android.widget.Button" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title1" instance="1"/>
                         <nest><android.widget.TextView index="0" text="Login" class="android.widget.TextView" package="org.tomdroid" content-desc="" checkable="false" checked="false" clickable="true" enabled="true" focusable="false" focused="false" scrollable="false" long-clickable="false" password="false" selected="false" bounds="[32,146][736,210]" resource-id="android:id/title2" instance="1"/>
@@ -1,16 +1,87 @@
+import asyncio
+import io
+import re
 import lxml.etree as etree
 import logging
 import abstraction
+import instrumentation
 from hashing import generate_state_hash
 from constants import *
 
 logger = logging.getLogger(__name__)
 
+_ROTATION_PATTERN = re.compile(r'<hierarchy\b[^>]*?\srotation="(\d+)"')
+
 
 def get_available_events(driver):
-    current_state = get_current_state(driver)
-    page_source = driver.page_source
-    possible_actions = get_possible_actions(page_source)
+    snapshot = get_ui_snapshot(driver)
+    return get_snapshot_events(snapshot)
+
+
+def get_ui_snapshot(driver, streaming=False):
+    try:
+        page_source = _get_page_source(driver)
+        current_activity = _get_current_activity(driver)
+        return _create_ui_snapshot(page_source, current_activity, streaming)
+    except Exception as e:
+        return _create_crash_snapshot(e)
+
+
+async def get_available_events_async(driver, streaming=False, thread_pool=None):
+    snapshot = await get_ui_snapshot_async(driver, streaming, thread_pool)
+    return get_snapshot_events(snapshot)
+
+
+async def get_ui_snapshot_async(driver, streaming=False, thread_pool=None):
+    # The driver calls block, so they run in a thread pool: the page source and the current activity are fetched
+    # concurrently, and parsing runs off the event loop so that other sessions can make progress meanwhile.
+    loop = asyncio.get_running_loop()
+    try:
+        page_source, current_activity = await asyncio.gather(
+            loop.run_in_executor(thread_pool, _get_page_source, driver),
+            loop.run_in_executor(thread_pool, _get_current_activity, driver))
+        return await loop.run_in_executor(thread_pool, _create_ui_snapshot, page_source, current_activity, streaming)
+    except Exception as e:
+        return _create_crash_snapshot(e)
+
+
+def _get_page_source(driver):
+    with instrumentation.phase(Phase.PAGE_SOURCE):
+        return driver.page_source
+
+
+def _get_current_activity(driver):
+    with instrumentation.phase(Phase.ACTIVITY):
+        return driver.current_activity
+
+
+def _create_ui_snapshot(page_source, current_activity, streaming=False):
+    possible_actions = get_possible_actions(page_source, streaming=streaming)
+    state_id = generate_state_hash(possible_actions)
+    current_state = abstraction.create_state(current_activity, state_id)
+    logger.debug("Current state: {}".format(current_state))
+    return abstraction.create_snapshot(page_source, possible_actions, current_state, get_rotation(page_source))
+
+
+def _create_crash_snapshot(error):
+    logger.error("Could not retrieve current state: {}".format(error))
+    current_state = abstraction.create_crash_state()
+    logger.debug("Current state: {}".format(current_state))
+    return abstraction.create_snapshot(None, [], current_state)
+
+
+def get_rotation(page_source):
+    # the root of the hierarchy reports the screen rotation, which tells callers when cached geometry is outdated
+    rotation_match = _ROTATION_PATTERN.search(page_source)
+    if rotation_match is None:
+        return None
+
+    return int(rotation_match.group(1))
+
+
+def get_snapshot_events(snapshot):
+    current_state = snapshot["state"]
+    possible_actions = snapshot["possibleActions"]
     text_entry_actions, non_text_entry_actions = classify_actions(possible_actions)
     if text_entry_actions:
         available_events = abstraction.create_partial_text_events(current_state, text_entry_actions, non_text_entry_actions)
@@ -35,19 +106,23 @@ def classify_actions(possible_actions):
     return text_entry_actions, non_text_entry_actions
 
 
-def get_possible_actions(page_source):
+def get_possible_actions(page_source, stats=None, streaming=False):
     possible_actions = []
-    actionable_widgets = _get_actionable_widgets(page_source)
+    if streaming:
+        actionable_widgets = _stream_actionable_widgets(page_source, stats)
+    else:
+        actionable_widgets = _get_actionable_widgets(page_source, stats)
     for action_type, widgets in actionable_widgets.items():
         for widget in widgets:
             action = abstraction.create_action(action_type, widget)
             possible_actions.append(action)
 
+    instrumentation.record_count("actionCount", len(possible_actions))
     logger.debug("Found {} possible actions.".format(len(possible_actions)))
     return possible_actions
 
 
-def _get_actionable_widgets(page_source):
+def _create_actionable_widget_lists():
     actionable_widgets = {
         GUIActionType.CLICK: [],
         GUIActionType.LONG_CLICK: [],
@@ -60,35 +135,141 @@ def _get_actionable_widgets(page_source):
         GUIActionType.TEXT_ENTRY: []
     }
 
-    xml_element = etree.fromstring(page_source.encode())
-    xml_tree = etree.ElementTree(xml_element)
-    for element in xml_tree.iter():
-        element_attributes = element.attrib
-        element_is_text_field = "EditText" in element_attributes.get("class", "")
-        element_is_enabled = element_attributes.get("enabled", "") == "true"
-        actionable_widget = abstraction.create_ui_widget(xml_tree, element)
-        if element_is_text_field and element_is_enabled:
-            actionable_widgets[GUIActionType.TEXT_ENTRY].append(actionable_widget)
-        else:
-            if _element_is_clickable(element):
-                actionable_widgets[GUIActionType.CLICK].append(actionable_widget)
-            if _element_is_long_clickable(element):
-                actionable_widgets[GUIActionType.LONG_CLICK].append(actionable_widget)
-            if _element_is_checkable(element):
-                if _element_is_checked(element):
-                    actionable_widgets[GUIActionType.UNCHECK].append(actionable_widget)
-                else:
-                    actionable_widgets[GUIActionType.CHECK].append(actionable_widget)
-            if _element_is_scrollable(element):
-                actionable_widgets[GUIActionType.SWIPE_UP].append(actionable_widget)
-                actionable_widgets[GUIActionType.SWIPE_DOWN].append(actionable_widget)
-                actionable_widgets[GUIActionType.SWIPE_RIGHT].append(actionable_widget)
-                actionable_widgets[GUIActionType.SWIPE_LEFT].append(actionable_widget)
+    return actionable_widgets
 
+
+def _get_actionable_widgets(page_source, stats=None):
+    actionable_widgets = _create_actionable_widget_lists()
+    with instrumentation.phase(Phase.PARSE):
+        xml_element = etree.fromstring(page_source.encode())
+        xml_tree = etree.ElementTree(xml_element)
+        resource_id_index = abstraction.create_resource_id_index(xml_tree)
+    widgets_built = 0
+    widgets_skipped = 0
+    with instrumentation.phase(Phase.SELECTORS):
+        for element in xml_tree.iter():
+            action_types = _get_element_action_types(element)
+            if not action_types:
+                # building a widget resolves its selector and description, which is wasted on layout-only nodes
+                widgets_skipped += 1
+                continue
+
+            actionable_widget = abstraction.create_ui_widget(xml_tree, element, resource_id_index)
+            widgets_built += 1
+            for action_type in action_types:
+                actionable_widgets[action_type].append(actionable_widget)
+
+    instrumentation.record_count("nodeCount", widgets_built + widgets_skipped)
+    if stats is not None:
+        stats["widgetsBuilt"] = widgets_built
+        stats["widgetsSkipped"] = widgets_skipped
+
+    logger.debug("Built {} widgets, skipped {} non-actionable elements.".format(widgets_built, widgets_skipped))
+    logger.debug("Found actionable widgets: {}".format(actionable_widgets))
+    return actionable_widgets
+
+
+def _stream_actionable_widgets(page_source, stats=None):
+    # Produces the same widgets as _get_actionable_widgets without keeping the whole tree in memory. Selectors can
+    # only be chosen once every resource-id has been counted, so actionable elements are recorded as they are
+    # parsed and resolved at the end of the document; everything else is freed as soon as it has been read.
+    actionable_widgets = _create_actionable_widget_lists()
+    resource_id_index = {}
+    pending_widgets = []
+    open_elements = []
+    widgets_skipped = 0
+    with instrumentation.phase(Phase.PARSE):
+        for event, element in etree.iterparse(io.BytesIO(page_source.encode()), events=("start", "end")):
+            if event == "end":
+                open_elements.pop()
+                element.clear()
+                if open_elements:
+                    while element.getprevious() is not None:
+                        del element.getparent()[0]
+                continue
+
+            if open_elements:
+                parent_path, sibling_counts = open_elements[-1]
+                position = sibling_counts.get(element.tag, 0) + 1
+                sibling_counts[element.tag] = position
+                element_path = (element.tag, position, parent_path, sibling_counts)
+                resource_id = element.attrib.get("resource-id")
+                if resource_id is not None:
+                    resource_id_index[resource_id] = resource_id_index.get(resource_id, 0) + 1
+            else:
+                element_path = (element.tag, None, None, None)
+            open_elements.append((element_path, {}))
+
+            action_types = _get_element_action_types(element)
+            if not action_types:
+                widgets_skipped += 1
+                continue
+
+            resource_id = element.attrib.get("resource-id", "")
+            widget_properties = abstraction.get_widget_properties(element)
+            widget_bounds = abstraction.get_widget_bounds(element)
+            pending_widgets.append((action_types, resource_id, element_path, widget_properties, widget_bounds))
+
+    with instrumentation.phase(Phase.SELECTORS):
+        for action_types, resource_id, element_path, widget_properties, widget_bounds in pending_widgets:
+            if abstraction.is_unique_resource_id(resource_id, resource_id_index.get(resource_id, 0)):
+                selection_mechanism = (SelectorType.ID, resource_id)
+            else:
+                selection_mechanism = (SelectorType.XPATH, _get_streamed_element_xpath(element_path))
+            actionable_widget = abstraction.create_target(selection_mechanism[0], selection_mechanism[1],
+                                                          *widget_properties, bounds=widget_bounds)
+            for action_type in action_types:
+                actionable_widgets[action_type].append(actionable_widget)
+
+    instrumentation.record_count("nodeCount", len(pending_widgets) + widgets_skipped)
+    if stats is not None:
+        stats["widgetsBuilt"] = len(pending_widgets)
+        stats["widgetsSkipped"] = widgets_skipped
+
+    logger.debug("Built {} widgets, skipped {} non-actionable elements.".format(len(pending_widgets),
+                                                                                widgets_skipped))
     logger.debug("Found actionable widgets: {}".format(actionable_widgets))
     return actionable_widgets
 
 
+def _get_streamed_element_xpath(element_path):
+    # same format as lxml's getpath: positions are only added when a parent has several children with the same tag
+    steps = []
+    while element_path is not None:
+        tag, position, parent_path, sibling_counts = element_path
+        if sibling_counts is not None and sibling_counts[tag] > 1:
+            steps.append("{}[{}]".format(tag, position))
+        else:
+            steps.append(tag)
+        element_path = parent_path
+
+    return "/" + "/".join(reversed(steps))
+
+
+def _get_element_action_types(element):
+    element_attributes = element.attrib
+    element_is_text_field = "EditText" in element_attributes.get("class", "")
+    element_is_enabled = element_attributes.get("enabled", "") == "true"
+    if element_is_text_field and element_is_enabled:
+        return [GUIActionType.TEXT_ENTRY]
+
+    action_types = []
+    if _element_is_clickable(element):
+        action_types.append(GUIActionType.CLICK)
+    if _element_is_long_clickable(element):
+        action_types.append(GUIActionType.LONG_CLICK)
+    if _element_is_checkable(element):
+        if _element_is_checked(element):
+            action_types.append(GUIActionType.UNCHECK)
+        else:
+            action_types.append(GUIActionType.CHECK)
+    if _element_is_scrollable(element):
+        action_types.extend([GUIActionType.SWIPE_UP, GUIActionType.SWIPE_DOWN,
+                             GUIActionType.SWIPE_RIGHT, GUIActionType.SWIPE_LEFT])
+
+    return action_types
+
+
 def _element_is_clickable(element):
     return element.attrib.get("clickable", "false") == "true"
 
@@ -110,16 +291,5 @@ def _element_is_checked(element):
 
 
 def get_current_state(driver):
-    try:
-        page_source = driver.page_source
-        possible_actions = get_possible_actions(page_source)
-        current_activity = driver.current_activity
-        state_id = generate_state_hash(possible_actions)
-        current_state = abstraction.create_state(current_activity, state_id)
-    except Exception as e:
-        logger.error("Could not retrieve current state: %s".format(e))
-        current_state = abstraction.create_crash_state()
-
-    logger.debug("Current state: {}".format(current_state))
-    return current_state
-
+    snapshot = get_ui_snapshot(driver)
+    return snapshot["state"]